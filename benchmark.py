@@ -0,0 +1,409 @@
+"""Benchmarks for the X DM script.
+
+    python benchmark.py e2e --sizes 100,1000,10000,100000 --dms 5
+    python benchmark.py e2e --sizes 100 --dms 20 --asset-kb 200 --block-resources image,media,font
+    python benchmark.py e2e --sizes 100 --dms 20 --boot-latency 0.5 --spa
+    python benchmark.py e2e --sizes 100 --dms 20 --dom-snapshots
+
+    python benchmark.py typing --lengths 40,280,1000,4000
+    python benchmark.py loader --lines 5000000 --messaged 200000
+    python benchmark.py logging --dms 5000
+
+e2e runs the real login_to_x, get_followers and send_dm in headless Chrome
+against mock_x_server.py and reports wall time and WebDriver round-trips per
+step. typing compares entering messages of several lengths with the
+single-step insert against per-line send_keys typing. loader compares RSS and time of loading a large followers.txt
+into lists against the streaming pipeline, each in its own process, with
+the given limit and without one.
+logging measures what the send loop's log calls cost the loop with each
+logging setup.
+Everything is written to a temporary directory so existing progress and
+follower files are left alone.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from itertools import cycle
+
+import mock_x_server
+
+
+class RoundTripCounter:
+    """Counts WebDriver commands by wrapping driver.execute"""
+
+    def __init__(self, driver):
+        self.count = 0
+        original = driver.execute
+
+        def counting_execute(*args, **kwargs):
+            self.count += 1
+            return original(*args, **kwargs)
+
+        driver.execute = counting_execute
+
+
+def measure(results, counter, step, size, func, *args):
+    """Run func, record its wall time and round-trips under step, return its result"""
+    before = counter.count
+    started = time.perf_counter()
+    result = func(*args)
+    results.append({
+        "step": step,
+        "size": size,
+        "seconds": time.perf_counter() - started,
+        "round_trips": counter.count - before,
+    })
+    return result
+
+
+def print_table(results):
+    """Print one row per measured step"""
+    print(f"{'step':<16}{'size':>10}{'seconds':>12}{'round-trips':>14}")
+    for row in results:
+        print(f"{row['step']:<16}{row['size']:>10}{row['seconds']:>12.3f}{row['round_trips']:>14}")
+
+
+def run_e2e(args):
+    """Benchmark login, follower collection and DMs against the mock server"""
+    import main
+
+    if not args.verbose:
+        main.logger.setLevel("WARNING")
+
+    server, base_url = mock_x_server.start_server(
+        latency=args.latency,
+        page_size=args.page_size,
+        virtualize=args.virtualize,
+        closed_every=args.closed_every,
+        asset_kb=args.asset_kb,
+        boot_latency=args.boot_latency,
+    )
+    main.X_BASE_URL = base_url
+    main.tracer.start("benchmark_trace.jsonl")
+    options = main.get_advanced_options({'options': {
+        'take_screenshots': False,
+        'resume_follower_collection': False,
+        'followers_max_scrolls': 10 ** 6,
+        'scroll_pause': args.scroll_pause,
+        'dm_interval': 0,
+        'spa_navigation': args.spa,
+        'dom_snapshots': 'all' if args.dom_snapshots else 'off',
+    }})
+    main.dom_snapshot_writer.configure(options)
+
+    results = []
+    driver = main.setup_driver(headless=True, block_resources=args.block_resources)
+    counter = RoundTripCounter(driver)
+    try:
+        logged_in = measure(results, counter, "login", 0, main.login_to_x, driver, "bench", "bench", options)
+        if not logged_in:
+            print("Login against the mock server failed")
+            return results
+
+        for size in args.sizes:
+            followers = measure(results, counter, "get_followers", size,
+                                main.get_followers, driver, f"bench{size}", options)
+            if len(followers) != size:
+                print(f"Warning: collected {len(followers)} of {size} followers")
+
+            for follower in followers[:args.dms]:
+                measure(results, counter, "send_dm", size, main.send_dm, driver, follower, args.message, options)
+    finally:
+        driver.quit()
+        server.shutdown()
+        main.tracer.close()
+        main.dom_snapshot_writer.close()
+
+    print_table(results)
+    dm_times = [row["seconds"] for row in results if row["step"] == "send_dm"]
+    if dm_times:
+        print(f"\nsend_dm: mean {statistics.mean(dm_times):.3f}s, "
+              f"p50 {statistics.median(dm_times):.3f}s, max {max(dm_times):.3f}s "
+              f"over {len(dm_times)} DMs, {len(server.state.sent)} received by the mock, "
+              f"{server.state.page_loads} full page loads")
+    print()
+    main.summarize_trace("benchmark_trace.jsonl")
+    if args.dom_snapshots:
+        print(f"\nDOM snapshots for replay_locators.py in {os.path.abspath(options['dom_snapshot_dir'])}")
+    return results
+
+
+def make_message(length, line_length=60):
+    """A templated-looking message of about length characters, wrapped onto several lines"""
+    words = cycle("Hey follower! Please follow our primary account, we had to switch accounts recently.".split())
+    text = ""
+    while len(text) < length:
+        text += next(words) + " "
+    return textwrap.fill(text.strip(), line_length)
+
+
+def run_typing(args):
+    """Time entering messages of several lengths with each message entry method"""
+    import main
+
+    if not args.verbose:
+        main.logger.setLevel("WARNING")
+
+    server, base_url = mock_x_server.start_server(latency=0)
+    main.import_selenium()
+    results = []
+    driver = main.setup_driver(headless=True)
+    counter = RoundTripCounter(driver)
+    methods = {"insert": main.insert_message, "type": main.type_message}
+    try:
+        for length in args.lengths:
+            message = make_message(length)
+            for method, enter in methods.items():
+                for _ in range(args.repeat):
+                    driver.get(f"{base_url}/follower1")
+                    main.WebDriverWait(driver, 10).until(
+                        main.EC.element_to_be_clickable((main.By.CSS_SELECTOR, "[data-testid='sendDMFromProfile']"))
+                    ).click()
+                    message_input = main.WebDriverWait(driver, 10).until(
+                        main.EC.presence_of_element_located((main.By.CSS_SELECTOR, "[data-testid='dmComposerTextInput']"))
+                    )
+                    entered = measure(results, counter, method, len(message), enter, driver, message_input, message)
+                    text = driver.execute_script(main.READ_MESSAGE_JS, message_input)
+                    results[-1]["matches"] = bool(entered) and ' '.join(text.split()) == ' '.join(message.split())
+    finally:
+        driver.quit()
+        server.shutdown()
+
+    print(f"{'method':<16}{'chars':>10}{'seconds':>12}{'round-trips':>14}{'matches':>10}")
+    for row in results:
+        print(f"{row['step']:<16}{row['size']:>10}{row['seconds']:>12.3f}{row['round_trips']:>14}{str(row['matches']):>10}")
+    return results
+
+
+# The log calls one follower makes in main()'s loop and send_dm, with typical arguments
+SEND_LOOP_LOG_CALLS = [
+    (logging.INFO, "Waiting %s seconds before next DM...", (10,)),
+    (logging.INFO, "Processing follower %d/%d: @%s", (512, 2500, "follower512")),
+    (logging.INFO, "Attempting to send DM to @%s...", ("follower512",)),
+    (logging.INFO, "Waiting for @%s's profile to load...", ("follower512",)),
+    (logging.DEBUG, "Page loaded %.1f KB in %d resources", (183.2, 41)),
+    (logging.INFO, "Found message button with data-testid", ()),
+    (logging.INFO, "Waiting for DM composer...", ()),
+    (logging.INFO, "Found message input with data-testid", ()),
+    (logging.INFO, "Will verify message containing: '%s'", ("Hey follower! Please",)),
+    (logging.INFO, "Message inserted in one step (%s)", ("paste",)),
+    (logging.INFO, "Found send button with data-testid", ()),
+    (logging.INFO, "Send button clicked via JavaScript", ()),
+    (logging.INFO, "Found our message in conversation: '%s'", ("Hey follower! Please",)),
+    (logging.INFO, "✅ DM CONFIRMED SENT: Successfully sent DM to @%s", ("follower512",)),
+    (logging.INFO, "Progress: %d/%d complete", (498, 2500)),
+]
+
+LOGGING_SETUPS = [
+    # (name, configure_logging options or None for setup_logging's handlers, format eagerly like f-strings)
+    ("before: f-strings, sync", None, True),
+    ("%-args, sync", None, False),
+    ("%-args, sync json+rotate", {'log_format': 'json', 'log_max_mb': 10, 'log_backups': 2, 'log_async': False}, False),
+    ("%-args, async", {'log_format': 'text', 'log_max_mb': 0, 'log_backups': 0, 'log_async': True}, False),
+    ("%-args, async json+rotate", {'log_format': 'json', 'log_max_mb': 10, 'log_backups': 2, 'log_async': True}, False),
+]
+
+
+def run_logging(args):
+    """Time the send loop's log calls under each logging setup, console output discarded"""
+    import main
+
+    results = []
+    for index, (name, log_options, eager) in enumerate(LOGGING_SETUPS):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+            main.stop_logging()
+            for handler in list(main.logger.handlers):
+                main.logger.removeHandler(handler)
+                handler.close()
+            main.LOG_FILE = f"logging_bench_{index}.log"
+            if log_options is None:
+                main.setup_logging()
+            else:
+                main.configure_logging(log_options)
+
+            started = time.perf_counter()
+            for _ in range(args.dms):
+                for level, message, message_args in SEND_LOOP_LOG_CALLS:
+                    if eager:
+                        main.logger.log(level, message % message_args)
+                    else:
+                        main.logger.log(level, message, *message_args)
+            in_loop = time.perf_counter() - started
+            main.stop_logging()
+            total = time.perf_counter() - started
+        results.append({"setup": name, "dms": args.dms, "loop_seconds": in_loop, "total_seconds": total})
+
+    print(f"{len(SEND_LOOP_LOG_CALLS)} log calls per DM, {args.dms} DMs")
+    print(f"{'setup':<28}{'us/DM in loop':>15}{'us/DM total':>14}")
+    for row in results:
+        print(f"{row['setup']:<28}{row['loop_seconds'] / args.dms * 1e6:>15.1f}"
+              f"{row['total_seconds'] / args.dms * 1e6:>14.1f}")
+    return results
+
+
+def write_followers_file(path, lines, duplicate_rate):
+    """Write a synthetic followers.txt, with some repeats in different case"""
+    rng = random.Random(1)
+    with open(path, 'w') as f:
+        for i in range(lines):
+            if i and rng.random() < duplicate_rate:
+                f.write(f"Follower{rng.randrange(i)}\n")
+            else:
+                f.write(f"follower{i}\n")
+
+
+def run_loader_worker(args):
+    """Run one loader mode in this process and print its peak RSS and time as JSON"""
+    import main
+    main.logger.setLevel("WARNING")
+
+    options = main.get_advanced_options({'options': {
+        'skip_first_n': args.skip,
+        'max_followers_to_process': args.limit or float('inf'),
+    }})
+    store = main.open_progress_store(options, read_only=True)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+
+    if args.mode == 'list':
+        # The pre-streaming approach: full list, filtered copy, sliced copies
+        followers = main.load_followers_from_file(args.path)
+        messaged_usernames = store.progress["messaged_usernames"]
+        followers_to_message = [f for f in followers if f not in messaged_usernames]
+        followers_to_message = followers_to_message[args.skip:]
+        if args.limit:
+            followers_to_message = followers_to_message[:args.limit]
+    else:
+        # What main() does: count in one streaming pass, then pull followers one at a time
+        main.count_followers_to_message(main.iter_followers_from_file(args.path), store, options)
+        followers_to_message = main.select_followers_to_message(
+            main.iter_followers_from_file(args.path), store, options
+        )
+
+    loop_start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Every follower ends up in the progress index as the send loop records it. The generated
+    # file repeats followers in different case only after their lowercase line, so a repeat
+    # is any follower selected whose lowercase name is already in the index
+    selected = 0
+    repeats = 0
+    for follower in followers_to_message:
+        if follower.lower() in store.progress["messaged_usernames"]:
+            repeats += 1
+        store.progress["messaged_usernames"].add(follower)
+        selected += 1
+
+    print(json.dumps({
+        "mode": args.mode,
+        "limit": args.limit,
+        "selected": selected,
+        "repeats": repeats,
+        "seconds": time.perf_counter() - started,
+        "baseline_rss_mb": rss_before / 1024,
+        "loop_start_rss_mb": loop_start_rss / 1024,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def run_loader(args):
+    """Compare list loading with the streaming pipeline on a large followers file"""
+    path = os.path.abspath("followers.txt")
+    write_followers_file(path, args.lines, args.duplicate_rate)
+    with open("messaged_followers.json", 'w') as f:
+        json.dump({"messaged_usernames": [f"follower{i}" for i in range(0, args.lines, 2)][:args.messaged]}, f)
+
+    results = []
+    # The unlimited case is always run too: that's when the whole selection used to be held
+    for limit in dict.fromkeys([args.limit, 0]):
+        for mode in ('list', 'stream'):
+            command = [sys.executable, os.path.abspath(__file__), "loader-worker", mode, path,
+                       "--skip", str(args.skip), "--limit", str(limit)]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{args.lines} lines, {args.messaged} already messaged, skip {args.skip}")
+    # Loop start is when the selection is ready, peak is after every follower was recorded as sent
+    # Repeats are mixed-case duplicates of messaged or already selected followers that got through
+    print(f"{'mode':<8}{'limit':>8}{'selected':>10}{'repeats':>9}{'seconds':>10}"
+          f"{'baseline RSS':>15}{'loop start':>13}{'peak RSS':>12}")
+    for row in results:
+        print(f"{row['mode']:<8}{row['limit'] or 'none':>8}{row['selected']:>10}{row['repeats']:>9}"
+              f"{row['seconds']:>10.2f}{row['baseline_rss_mb']:>12.1f} MB"
+              f"{row['loop_start_rss_mb']:>10.1f} MB{row['peak_rss_mb']:>9.1f} MB")
+    return results
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmarks for the X DM script")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the script's INFO logging")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    e2e = subparsers.add_parser("e2e", help="Real script functions against the mock server in headless Chrome")
+    e2e.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(',')], default=[100, 1000, 10000, 100000],
+                     help="Comma separated follower list sizes")
+    e2e.add_argument("--dms", type=int, default=5, help="DMs to send per follower list size")
+    e2e.add_argument("--message", default="Hello from the benchmark\nSecond line")
+    e2e.add_argument("--latency", type=float, default=0.05, help="Mock rendering latency in seconds")
+    e2e.add_argument("--page-size", type=int, default=100, help="Followers per lazy load")
+    e2e.add_argument("--virtualize", type=int, default=200, help="Follower cells kept in the DOM (0 keeps all)")
+    e2e.add_argument("--closed-every", type=int, default=0, help="Every Nth follower has DMs closed")
+    e2e.add_argument("--scroll-pause", type=float, default=0.2, help="scroll_pause option for get_followers")
+    e2e.add_argument("--asset-kb", type=int, default=0, help="Size of each mock avatar, banner and font in KB")
+    e2e.add_argument("--boot-latency", type=float, default=0.0, help="Mock app boot time per full page load")
+    e2e.add_argument("--spa", action="store_true", help="Enable the spa_navigation option")
+    e2e.add_argument("--dom-snapshots", action="store_true",
+                     help="Save a DOM snapshot at every step, a corpus for replay_locators.py")
+    e2e.add_argument("--block-resources", type=lambda s: [c for c in s.split(',') if c], default=[],
+                     help="Comma separated block_resources option, e.g. image,media,font")
+    e2e.set_defaults(func=run_e2e)
+
+    typing = subparsers.add_parser("typing", help="Message entry time by length, single-step insert vs typing")
+    typing.add_argument("--lengths", type=lambda s: [int(n) for n in s.split(',')], default=[40, 280, 1000, 4000],
+                        help="Comma separated message lengths in characters")
+    typing.add_argument("--repeat", type=int, default=3, help="Runs per method and length")
+    typing.set_defaults(func=run_typing)
+
+    logging_bench = subparsers.add_parser("logging", help="Cost of the send loop's log calls per logging setup")
+    logging_bench.add_argument("--dms", type=int, default=5000, help="Simulated DMs")
+    logging_bench.set_defaults(func=run_logging)
+
+    loader = subparsers.add_parser("loader", help="Peak memory of loading a large followers.txt")
+    loader.add_argument("--lines", type=int, default=2000000, help="Lines in the generated followers.txt")
+    loader.add_argument("--messaged", type=int, default=100000, help="Followers already in the progress file")
+    loader.add_argument("--duplicate-rate", type=float, default=0.05, help="Share of lines repeating a follower")
+    loader.add_argument("--skip", type=int, default=0, help="skip_first_n option")
+    loader.add_argument("--limit", type=int, default=2500,
+                        help="max_followers_to_process option, run alongside an unlimited case (0 for only that)")
+    loader.set_defaults(func=run_loader)
+
+    worker = subparsers.add_parser("loader-worker")
+    worker.add_argument("mode", choices=['list', 'stream'])
+    worker.add_argument("path")
+    worker.add_argument("--skip", type=int, default=0)
+    worker.add_argument("--limit", type=int, default=0)
+    worker.set_defaults(func=run_loader_worker)
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None
+    if args.benchmark != "loader-worker":
+        os.chdir(tempfile.mkdtemp(prefix="x_dm_bench_"))
+    results = args.func(args)
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, indent=4)
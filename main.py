@@ -2,22 +2,61 @@ import time
 import json
 import os
 import logging
-from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import logging.handlers
+import sqlite3
+import argparse
+import cProfile
+import pstats
+import tracemalloc
+import threading
+import queue
+from collections import deque, namedtuple
+from bisect import bisect_left
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import glob
+from itertools import chain, islice
+from datetime import datetime, timedelta
 import yaml
 
+try:
+    import psutil  # Optional, the browser memory watchdog falls back to /proc on Linux
+except ImportError:
+    psutil = None
+
+# Selenium is imported by import_selenium() on first use, so browser-free modes like --plan start instantly
+webdriver = By = Keys = WebDriverWait = EC = TimeoutException = NoSuchElementException = None
+
 # Constants
 CONFIG_FILE = "config.yml"
+X_BASE_URL = "https://x.com"  # Overridden by the benchmark to point at the local mock server
 PROGRESS_FILE = "messaged_followers.json"
 FAIL_FILE = "messaged_fail.json"
+PROGRESS_JOURNAL_FILE = "messaged_followers.journal"
+PROGRESS_DB_FILE = "campaign_state.db"
 FOLLOWERS_FILE = "followers.txt"
-LOG_FILE = f"x_dm_script_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-DM_INTERVAL = 15  # seconds between DMs
+FOLLOWERS_LIST_FILE = "followers_list.txt"
+FOLLOWERS_CHECKPOINT_FILE = "followers_checkpoint.json"
+LOCATOR_STATS_FILE = "locator_stats.json"
+ELIGIBILITY_FILE = "dm_eligibility.json"
+SCREENSHOT_DIR = "screenshots"
+DOM_SNAPSHOT_DIR = "dom_snapshots"
+RUN_TIMESTAMP = datetime.now().strftime('%Y%m%d_%H%M%S')
+LOG_FILE = f"x_dm_script_{RUN_TIMESTAMP}.log"
+TRACE_FILE = f"x_dm_trace_{RUN_TIMESTAMP}.jsonl"
+PROFILE_DIR = f"x_dm_profile_{RUN_TIMESTAMP}"
+DEFAULT_SEND_SECONDS = 20  # Rough send_dm time used by --plan before any run has been traced
+
+def import_selenium():
+    """Import Selenium into the module globals the browser functions use"""
+    global webdriver, By, Keys, WebDriverWait, EC, TimeoutException, NoSuchElementException
+    if webdriver is not None:
+        return
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
 # Set up logging
 def setup_logging():
@@ -50,6 +89,536 @@ def setup_logging():
 # Initialize logger
 logger = setup_logging()
 
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per record"""
+
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname, "msg": record.getMessage()}
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Queues the record as it is, so even the %-formatting happens on the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+log_listener = None
+
+def configure_logging(options):
+    """Apply the logging options: JSON records, size-based rotation and a background writer thread"""
+    global log_listener
+    if options['log_format'] == 'text' and not options['log_max_mb'] and not options['log_async']:
+        return  # Keep the handlers from setup_logging()
+    
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    
+    if options['log_max_mb']:
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=int(options['log_max_mb'] * 1024 * 1024), backupCount=options['log_backups']
+        )
+    else:
+        file_handler = logging.FileHandler(LOG_FILE)
+    console_handler = logging.StreamHandler()
+    text_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler.setFormatter(JsonFormatter() if options['log_format'] == 'json' else text_formatter)
+    console_handler.setFormatter(text_formatter)
+    
+    if options['log_async']:
+        # The caller only puts the record on a queue, a listener thread formats and writes it
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(LazyQueueHandler(log_queue))
+        log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+        log_listener.start()
+    else:
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+class Clock:
+    """Time source for the send loop's pacing and progress commits, simulate_campaign.py swaps in a virtual one"""
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def monotonic(self):
+        return time.monotonic()
+
+clock = Clock()
+
+class Span:
+    """One timed step, use as a context manager via Tracer.span()"""
+    __slots__ = ('tracer', 'name', 'attrs', 'outcome', 'started_at', 'started')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.outcome = 'ok'
+
+    def __enter__(self):
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.outcome = 'error'
+        self.tracer.record(self, duration)
+        return False
+
+class Tracer:
+    """Records step durations and outcomes as JSON lines"""
+
+    def __init__(self):
+        self.file = None
+        self.buffer = []
+        self.listeners = []  # Called with (span, duration) for every span, even when not tracing to a file
+
+    def start(self, path=TRACE_FILE):
+        """Start writing spans to path"""
+        self.file = open(path, 'a')
+        logger.info(f"Tracing steps to {path}")
+
+    def span(self, name, **attrs):
+        """Time a step: with tracer.span('verify') as span: ... span.outcome = 'miss'"""
+        return Span(self, name, attrs)
+
+    def record(self, span, duration):
+        """Buffer a finished span"""
+        for listener in self.listeners:
+            listener(span, duration)
+        if self.file is None:
+            return
+        entry = {"span": span.name, "at": span.started_at, "duration": duration, "outcome": span.outcome}
+        entry.update(span.attrs)
+        self.buffer.append(json.dumps(entry) + "\n")
+        if len(self.buffer) >= 100:
+            self.flush()
+
+    def flush(self):
+        """Write buffered spans to the trace file"""
+        if self.file and self.buffer:
+            self.file.write(''.join(self.buffer))
+            self.file.flush()
+        self.buffer = []
+
+    def close(self):
+        """Flush and close the trace file"""
+        self.flush()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+tracer = Tracer()
+
+METRIC_HELP = {
+    'x_dm_dms_sent_total': ('counter', "DMs sent this run"),
+    'x_dm_dms_failed_total': ('counter', "DMs that finally failed this run, by reason"),
+    'x_dm_retries_total': ('counter', "Failed DMs queued for a retry after the main pass"),
+    'x_dm_browser_recycles_total': ('counter', "Browser restarts by the memory watchdog"),
+    'x_dm_messaged_users': ('gauge', "Users messaged across all runs"),
+    'x_dm_queue_remaining': ('gauge', "Followers (including queued retries) left in this run"),
+    'x_dm_eta_seconds': ('gauge', "Estimated seconds until the queue is empty"),
+    'x_dm_browser_rss_bytes': ('gauge', "Resident memory of the browser process tree"),
+    'x_dm_browser_js_heap_bytes': ('gauge', "Used JS heap of the current page"),
+    'x_dm_step_duration_seconds': ('histogram', "Duration of each traced step"),
+    'x_dm_progress_commit_seconds': ('histogram', "Time to durably commit progress (write and fsync)"),
+}
+
+class Metrics:
+    """Counters, gauges and histograms for a long run, served in Prometheus text format on a local port"""
+    BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.values = {}  # (name, labels) -> counter or gauge value
+        self.histograms = {}  # (name, labels) -> per-bucket counts followed by sum and count
+        self.server = None
+
+    def start(self, port):
+        """Start collecting and serve /metrics on 127.0.0.1:port from a daemon thread"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Could not start the metrics endpoint on port {port}: {e}")
+            return
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+        self.enabled = True
+        logger.info(f"Serving live metrics at http://127.0.0.1:{port}/metrics")
+
+    def inc(self, name, amount=1, **labels):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        """Set a gauge"""
+        if not self.enabled or value is None:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = value
+
+    def observe(self, name, value, **labels):
+        """Add a sample to a histogram"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * len(self.BUCKETS) + [0.0, 0]
+            histogram[bisect_left(self.BUCKETS, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def render(self):
+        """All metrics in Prometheus text exposition format"""
+        with self.lock:
+            values = sorted(self.values.items())
+            histograms = sorted((key, list(counts)) for key, counts in self.histograms.items())
+        
+        def label_text(labels, extra=()):
+            pairs = []
+            for key, value in labels + tuple(extra):
+                value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                pairs.append(f'{key}="{value}"')
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+        
+        lines = []
+        described = set()
+        for (name, labels), value in values:
+            if name not in described:
+                described.add(name)
+                kind, help_text = METRIC_HELP.get(name, ('untyped', name))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines.append(f"{name}{label_text(labels)} {value}")
+        for (name, labels), counts in histograms:
+            if name not in described:
+                described.add(name)
+                kind, help_text = METRIC_HELP.get(name, ('histogram', name))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            cumulative = 0
+            for bound, count in zip(self.BUCKETS, counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f"{name}_bucket{label_text(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{label_text(labels)} {counts[-2]}")
+            lines.append(f"{name}_count{label_text(labels)} {counts[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        """Stop serving metrics"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        self.enabled = False
+
+metrics = Metrics()
+
+class RunProfiler:
+    """--profile: cProfile over the whole run plus tracemalloc snapshots every N followers"""
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = PROFILE_DIR
+        self.snapshot_every = 100
+        self.profile = None
+        self.first_snapshot = None
+        self.last_snapshot = None
+
+    def run(self, func, *args, snapshot_every=100):
+        """Call func(*args) under the profilers and write the reports when it returns"""
+        self.snapshot_every = max(1, snapshot_every)
+        os.makedirs(self.directory, exist_ok=True)
+        logger.info(f"Profiling this run into {self.directory}/")
+        tracemalloc.start(10)
+        self.first_snapshot = self.last_snapshot = self.take_snapshot()
+        self.profile = cProfile.Profile()
+        self.enabled = True
+        self.profile.enable()
+        try:
+            return func(*args)
+        finally:
+            self.profile.disable()
+            self.enabled = False
+            self.write_reports()
+            tracemalloc.stop()
+
+    def take_snapshot(self):
+        """Allocation snapshot without the profiler's own frames"""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+
+    def write_allocation_diff(self, name, snapshot, baseline, title):
+        """Top allocation growth of snapshot over baseline, by source line"""
+        current, peak = tracemalloc.get_traced_memory()
+        with open(os.path.join(self.directory, name), 'w') as f:
+            f.write(f"{title}\ntraced memory: {current / 1024 / 1024:.1f} MB, peak {peak / 1024 / 1024:.1f} MB\n\n")
+            for stat in snapshot.compare_to(baseline, 'lineno')[:30]:
+                f.write(f"{stat}\n")
+
+    def follower_done(self, count):
+        """Call after each follower, takes an allocation snapshot every snapshot_every followers"""
+        if not self.enabled or count % self.snapshot_every:
+            return
+        self.profile.disable()  # Keep the snapshot itself out of the CPU profile
+        snapshot = self.take_snapshot()
+        self.write_allocation_diff(f"alloc_{count:07d}.txt", snapshot, self.last_snapshot,
+                                   f"Allocations after {count} followers, compared with the previous snapshot")
+        self.last_snapshot = snapshot
+        self.profile.enable()
+
+    def write_reports(self):
+        """cpu.pstats for snakeviz/pstats, a readable top list and the allocation growth over the run"""
+        self.profile.dump_stats(os.path.join(self.directory, "cpu.pstats"))
+        with open(os.path.join(self.directory, "cpu_top.txt"), 'w') as f:
+            stats = pstats.Stats(self.profile, stream=f).strip_dirs()
+            stats.sort_stats('cumulative').print_stats(40)
+            stats.sort_stats('tottime').print_stats(40)
+        self.write_allocation_diff("alloc_total.txt", self.take_snapshot(), self.first_snapshot,
+                                   "Allocations at the end of the run, compared with the start")
+        logger.info(f"Profile written to {self.directory}/ (cpu.pstats, cpu_top.txt, alloc_*.txt)")
+
+run_profiler = RunProfiler()
+
+SUCCESS_OUTCOMES = ('ok', 'hit', 'sent', 'found', 'empty', 'url', 'spa')
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, -(-len(sorted_values) * pct // 100) - 1)
+    return sorted_values[int(index)]
+
+def summarize_trace(path):
+    """Print count, success rate and p50/p95/p99 duration per step for a trace file"""
+    durations = {}
+    successes = {}
+    page_bytes = {}
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            durations.setdefault(entry["span"], []).append(entry["duration"])
+            if "bytes" in entry:
+                page_bytes.setdefault(entry["span"], []).append(entry["bytes"])
+            if entry["outcome"] in SUCCESS_OUTCOMES:
+                successes[entry["span"]] = successes.get(entry["span"], 0) + 1
+
+    print(f"{'step':<32}{'count':>8}{'ok':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'total':>11}")
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        values.sort()
+        ok_rate = successes.get(name, 0) / len(values)
+        print(f"{name:<32}{len(values):>8}{ok_rate:>7.0%}"
+              f"{percentile(values, 50):>9.3f}s{percentile(values, 95):>9.3f}s"
+              f"{percentile(values, 99):>9.3f}s{sum(values):>10.1f}s")
+    
+    for name, values in sorted(page_bytes.items()):
+        print(f"{name}: {sum(values) / len(values) / 1024:.1f} KB transferred per page load "
+              f"({sum(values) / 1024 / 1024:.1f} MB over {len(values)} loads)")
+
+class ScreenshotWriter:
+    """Writes screenshots from a bounded queue on a background thread, enforcing retention limits"""
+    label = "Screenshot"
+    extension = ".png"
+
+    def __init__(self, directory=SCREENSHOT_DIR):
+        self.directory = directory
+        self.mode = 'all'
+        self.keep_last = 0
+        self.quota_bytes = 0
+        self.queue = queue.Queue(maxsize=16)
+        self.thread = None
+        self.files = deque()  # (path, size), oldest first
+        self.total_bytes = 0
+
+    def configure(self, options):
+        """Apply the screenshot options ('all' or 'failure' mode, keep-last count, disk quota)"""
+        self.directory = options['screenshot_dir']
+        self.mode = options['screenshot_mode']
+        self.keep_last = options['screenshot_keep_last']
+        self.quota_bytes = int(options['screenshot_quota_mb'] * 1024 * 1024)
+
+    def wants(self, failure):
+        """Whether a screenshot of this kind should be captured at all"""
+        return failure or self.mode == 'all'
+
+    def start(self):
+        """Pick up screenshots kept from earlier runs and start the writer thread"""
+        os.makedirs(self.directory, exist_ok=True)
+        existing = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(self.extension):
+                stat = entry.stat()
+                existing.append((stat.st_mtime, entry.path, stat.st_size))
+        for _, path, size in sorted(existing):
+            self.files.append((path, size))
+            self.total_bytes += size
+        self.enforce_limits()
+
+        self.thread = threading.Thread(target=self.run, name=f"{self.label.lower().replace(' ', '-')}-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, name, data):
+        """Queue file bytes for writing, dropping them if the writer has fallen behind"""
+        if self.thread is None:
+            self.start()
+        path = os.path.join(self.directory, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{self.extension}")
+        try:
+            self.queue.put_nowait((path, data))
+            return path
+        except queue.Full:
+            logger.warning(f"{self.label} writer is behind, dropped {path}")
+            return None
+
+    def run(self):
+        """Writer thread: write queued screenshots until the None sentinel"""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            path, data = item
+            try:
+                with open(path, 'wb') as f:
+                    f.write(data)
+                self.files.append((path, len(data)))
+                self.total_bytes += len(data)
+                self.enforce_limits()
+            except Exception as e:
+                logger.error(f"Failed to write {self.label.lower()} {path}: {e}")
+
+    def enforce_limits(self):
+        """Delete the oldest screenshots beyond keep_last or the disk quota"""
+        while self.files and ((self.keep_last and len(self.files) > self.keep_last) or
+                              (self.quota_bytes and self.total_bytes > self.quota_bytes)):
+            path, size = self.files.popleft()
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        """Write everything still queued and stop the thread"""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+screenshot_writer = ScreenshotWriter()
+
+class DomSnapshotWriter(ScreenshotWriter):
+    """Writes page HTML for replay_locators.py, with the same background queue and retention as screenshots"""
+    label = "DOM snapshot"
+    extension = ".html"
+
+    def __init__(self):
+        super().__init__(DOM_SNAPSHOT_DIR)
+        self.mode = 'off'
+
+    def configure(self, options):
+        """Apply the dom_snapshots mode ('off', 'failure' or 'all'), directory and keep-last count"""
+        self.directory = options['dom_snapshot_dir']
+        self.mode = options['dom_snapshots'] or 'off'  # YAML reads a bare off as False
+        self.keep_last = options['dom_snapshot_keep_last']
+
+    def wants(self, failure):
+        """Whether a snapshot of this kind should be captured at all"""
+        return self.mode == 'all' or (failure and self.mode == 'failure')
+
+dom_snapshot_writer = DomSnapshotWriter()
+
+# The page as static HTML: scripts removed so a replay can't run X's app or reach the network,
+# and the rules React inserts into <style> sheets through the CSSOM written out as text,
+# since outerHTML doesn't include them and visibility checks depend on them
+DOM_SNAPSHOT_JS = """
+    var clone = document.documentElement.cloneNode(true);
+    var styles = document.querySelectorAll('style');
+    var cloneStyles = clone.querySelectorAll('style');
+    for (var i = 0; i < styles.length && i < cloneStyles.length; i++) {
+        try {
+            var rules = styles[i].sheet ? styles[i].sheet.cssRules : null;
+            if (rules && rules.length) {
+                var text = [];
+                for (var j = 0; j < rules.length; j++) {
+                    text.push(rules[j].cssText);
+                }
+                cloneStyles[i].textContent = text.join('\\n');
+            }
+        } catch (e) {}
+    }
+    var inert = clone.querySelectorAll('script, noscript, iframe, link[rel="preload"], link[rel="modulepreload"]');
+    for (var k = 0; k < inert.length; k++) {
+        inert[k].parentNode.removeChild(inert[k]);
+    }
+    var head = clone.querySelector('head');
+    if (head) {
+        var meta = document.createElement('meta');
+        meta.setAttribute('name', 'x-dm-snapshot');
+        meta.setAttribute('content', location.href);
+        head.insertBefore(meta, head.firstChild);
+    }
+    return '<!DOCTYPE html>\\n' + clone.outerHTML;
+"""
+
+def take_screenshot(driver, name, failure=False):
+    """Capture a screenshot for debugging, written to disk in the background"""
+    if not screenshot_writer.wants(failure):
+        return
+    with tracer.span('screenshot'):
+        try:
+            path = screenshot_writer.submit(name, driver.get_screenshot_as_png())
+            if path:
+                logger.info("Screenshot queued as %s", path)
+        except Exception:
+            logger.error("Failed to save screenshot")
+
+def take_dom_snapshot(driver, name, failure=False):
+    """Capture the page's HTML for offline locator replay, written to disk in the background"""
+    if not dom_snapshot_writer.wants(failure):
+        return
+    with tracer.span('dom_snapshot'):
+        try:
+            path = dom_snapshot_writer.submit(name, driver.execute_script(DOM_SNAPSHOT_JS).encode('utf-8'))
+            if path:
+                logger.info("DOM snapshot queued as %s", path)
+        except Exception as e:
+            logger.error("Failed to capture DOM snapshot: %s", e)
+
 def get_advanced_options(config):
     """Extract advanced options from config with defaults"""
     if 'options' not in config:
@@ -58,9 +627,51 @@ def get_advanced_options(config):
     options = {
         'dm_interval': config['options'].get('dm_interval', 15),
         'retry_failed': config['options'].get('retry_failed', False),
+        'max_retries': config['options'].get('max_retries', 1),  # Retries per follower after the main pass
+        'eligibility_ttl_days': config['options'].get('eligibility_ttl_days', 14),  # 0 turns the DMs-closed cache off
         'max_followers_to_process': config['options'].get('max_followers_to_process', float('inf')),
         'skip_first_n': config['options'].get('skip_first_n', 0),
-        'take_screenshots': config['options'].get('take_screenshots', True)  # New option for screenshots
+        'take_screenshots': config['options'].get('take_screenshots', True),  # New option for screenshots
+        'progress_group_size': config['options'].get('progress_group_size', 1),
+        'progress_group_interval': config['options'].get('progress_group_interval', 5),
+        'progress_compact_every': config['options'].get('progress_compact_every', 1000),
+        'progress_store': config['options'].get('progress_store', 'json'),  # 'json' or 'sqlite'
+        'progress_db': config['options'].get('progress_db', PROGRESS_DB_FILE),
+        'trace_steps': config['options'].get('trace_steps', True),
+        'log_format': config['options'].get('log_format', 'text'),  # 'text' or 'json' (log file only)
+        'log_max_mb': config['options'].get('log_max_mb', 0),  # Rotate the log file at this size, 0 never rotates
+        'log_backups': config['options'].get('log_backups', 5),
+        'log_async': config['options'].get('log_async', False),  # Write log records from a background thread
+        'metrics_port': config['options'].get('metrics_port', 0),  # Serve Prometheus metrics on 127.0.0.1:<port>, 0 is off
+        'screenshot_mode': config['options'].get('screenshot_mode', 'all'),  # 'all' or 'failure'
+        'screenshot_keep_last': config['options'].get('screenshot_keep_last', 0),  # 0 keeps all
+        'screenshot_quota_mb': config['options'].get('screenshot_quota_mb', 0),  # 0 means no quota
+        'screenshot_dir': config['options'].get('screenshot_dir', SCREENSHOT_DIR),
+        'dom_snapshots': config['options'].get('dom_snapshots', 'off'),  # 'off', 'failure' or 'all'
+        'dom_snapshot_dir': config['options'].get('dom_snapshot_dir', DOM_SNAPSHOT_DIR),
+        'dom_snapshot_keep_last': config['options'].get('dom_snapshot_keep_last', 0),  # 0 keeps all
+        'chrome_profile_dir': config['options'].get('chrome_profile_dir'),  # None starts a fresh profile every run
+        'session_check_timeout': config['options'].get('session_check_timeout', 8),
+        'resume_follower_collection': config['options'].get('resume_follower_collection', True),
+        'followers_max_scrolls': config['options'].get('followers_max_scrolls', 100),
+        'scroll_pause': config['options'].get('scroll_pause', 3),
+        # Upper bounds (seconds) for the readiness waits in send_dm, each step moves on as soon as the page is ready
+        'profile_ready_timeout': config['options'].get('profile_ready_timeout', 3),
+        'composer_timeout': config['options'].get('composer_timeout', 13),
+        'send_ready_timeout': config['options'].get('send_ready_timeout', 2),
+        'verify_timeout': config['options'].get('verify_timeout', 5),
+        'dms_closed_grace': config['options'].get('dms_closed_grace', 1.5),
+        'message_entry': config['options'].get('message_entry', 'insert'),  # 'insert' (one script call) or 'type' (send_keys per line)
+        # Resource categories ('image', 'media', 'font') or raw URL patterns that Chrome never downloads
+        'block_resources': config['options'].get('block_resources', []),
+        # Open profiles through X's client-side router instead of reloading the whole app per follower
+        'spa_navigation': config['options'].get('spa_navigation', False),
+        'spa_navigation_timeout': config['options'].get('spa_navigation_timeout', 5),
+        # Restart Chrome between followers when it grows too large (0 disables each limit)
+        'browser_max_rss_mb': config['options'].get('browser_max_rss_mb', 0),
+        'browser_max_js_heap_mb': config['options'].get('browser_max_js_heap_mb', 0),
+        'browser_recycle_every': config['options'].get('browser_recycle_every', 0),
+        'browser_check_every': config['options'].get('browser_check_every', 20)
     }
     
     logger.info(f"Using advanced options: {options}")
@@ -78,11 +689,11 @@ def load_config():
         logger.error(f"Failed to load configuration: {e}")
         raise
 
-def load_followers_from_file():
+def load_followers_from_file(path=FOLLOWERS_FILE):
     """Load followers from followers.txt file"""
-    logger.info(f"Loading followers from {FOLLOWERS_FILE}")
+    logger.info(f"Loading followers from {path}")
     try:
-        with open(FOLLOWERS_FILE, 'r') as f:
+        with open(path, 'r') as f:
             followers = [line.strip() for line in f if line.strip()]
             logger.info(f"Loaded {len(followers)} followers from file")
             return followers
@@ -90,8 +701,31 @@ def load_followers_from_file():
         logger.error(f"Failed to load followers from file: {e}")
         return []
 
+def iter_followers_from_file(path=FOLLOWERS_FILE):
+    """Stream normalized usernames from a followers file one line at a time"""
+    logger.info(f"Streaming followers from {path}")
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                username = line.strip().lstrip('@')
+                if username:
+                    yield username
+    except Exception as e:
+        logger.error(f"Failed to load followers from file: {e}")
+
+def dedupe_followers(usernames):
+    """Drop repeated usernames, comparing case-insensitively like X does"""
+    seen = set()
+    for username in usernames:
+        key = username.lower()
+        if key == username:
+            key = username  # share the string instead of keeping a lowercase copy
+        if key not in seen:
+            seen.add(key)
+            yield username
+
 def load_progress():
-    """Load list of already messaged followers and failed attempts"""
+    """Load already messaged followers and users with failed attempts, replaying the journal"""
     progress = {"messaged_usernames": [], "started_at": datetime.now().isoformat(), "stats": {"success": 0, "failed": 0}}
     failed = []
 
@@ -107,60 +741,470 @@ def load_progress():
             failed = json.load(f)
             logger.info(f"Found {len(failed)} previously failed attempts")
 
+    progress["messaged_usernames"] = set(progress.get("messaged_usernames", []))
+    progress.setdefault("stats", {"success": 0, "failed": 0})
+
+    # The fail file is written before the progress snapshot during compaction, so it
+    # may hold failures the snapshot doesn't know about yet. Those are in the journal.
+    if "failed_count" in progress:
+        del failed[progress["failed_count"]:]
+    # Insertion-ordered set: each user is listed once however often they failed
+    failed = dict.fromkeys(failed)
+
+    replayed = replay_progress_journal(progress, failed)
+    if replayed:
+        logger.info(f"Replayed {replayed} attempts from {PROGRESS_JOURNAL_FILE}")
+
     return progress, failed
 
+def apply_attempt(progress, failed, username, success):
+    """Apply the outcome of one DM attempt to the in-memory progress state"""
+    if success:
+        progress["messaged_usernames"].add(username)
+        progress["stats"]["success"] += 1
+    else:
+        progress["stats"]["failed"] += 1
+        failed[username] = None
+
+def replay_progress_journal(progress, failed):
+    """Apply committed journal records newer than the snapshot, returns number applied"""
+    if not os.path.exists(PROGRESS_JOURNAL_FILE):
+        return 0
+
+    snapshot_seq = progress.get("journal_seq", 0)
+    pending = []
+    applied = 0
+    with open(PROGRESS_JOURNAL_FILE, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn write from a crash, nothing after this point was committed
+                logger.warning(f"Ignoring incomplete tail of {PROGRESS_JOURNAL_FILE}")
+                break
+            if "commit" not in record:
+                pending.append(record)
+                continue
+            for entry in pending:
+                if entry["seq"] > snapshot_seq:
+                    apply_attempt(progress, failed, entry["username"], entry["success"])
+                    progress["journal_seq"] = entry["seq"]
+                    applied += 1
+            pending = []
+    return applied
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file and rename it over path, so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 def save_progress(progress, failed):
-    """Save list of messaged followers and failed attempts"""
+    """Save a full snapshot of messaged followers and failed attempts"""
     progress["last_updated"] = datetime.now().isoformat()
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f, indent=4)
-    with open(FAIL_FILE, 'w') as f:
-        json.dump(failed, f, indent=4)
-
-def message_followers(config, followers):
-    """Send DMs to followers"""
-    # Placeholder function for DM logic
-    messaged = []
-    for follower in followers:
-        if follower in messaged:  # Skip already messaged
-            continue
-        try:
-            # Logic to send DM goes here
-            logger.info(f"Messaging follower: {follower}")
-            time.sleep(DM_INTERVAL)
-            messaged.append(follower)
-        except Exception as e:
-            logger.error(f"Failed to message follower {follower}: {e}")
-    return messaged
+    progress["failed_count"] = len(failed)
+    snapshot = dict(progress, messaged_usernames=sorted(progress["messaged_usernames"]))
+    # Progress goes last: its rename is what commits the snapshot
+    write_json_atomic(FAIL_FILE, list(failed))
+    write_json_atomic(PROGRESS_FILE, snapshot)
 
-if __name__ == "__main__":
-    config = load_config()
-    use_followers_txt = config.get('useFollowerstxt', False)
+# The journal is folded into the snapshot once it holds this fraction of the snapshot's entries
+# (and at least compact_every attempts). Rewriting the snapshot then costs O(1) per attempt amortized
+JOURNAL_COMPACT_RATIO = 0.25
 
-    if use_followers_txt:
-        followers = load_followers_from_file()
-    else:
-        # Replace with existing logic for scrolling and fetching followers
-        followers = []  # Placeholder for scrolling logic
+class ProgressJournal:
+    """Append-only log of DM attempts, periodically compacted into the JSON snapshot files"""
+
+    def __init__(self, progress, failed, group_size=1, group_interval=5, compact_every=1000, read_only=False):
+        self.progress = progress
+        self.failed = failed
+        self.group_size = max(1, group_size)
+        self.group_interval = group_interval
+        self.compact_every = compact_every
+        self.seq = progress.get("journal_seq", 0)
+        self.pending = []
+        self.last_commit = clock.monotonic()
+        self.since_compact = 0
+        self.compact_at = self.compact_threshold()
+        self.read_only = read_only
+        self.file = None
+        if read_only:
+            return
+
+        # Fold whatever load_progress() replayed into a fresh snapshot
+        if os.path.exists(PROGRESS_JOURNAL_FILE) and os.path.getsize(PROGRESS_JOURNAL_FILE) > 0:
+            self.compact()
+        self.file = open(PROGRESS_JOURNAL_FILE, 'a')
+
+    def record(self, username, success, reason=None):
+        """Apply an attempt to the progress state and queue it for the next group commit"""
+        apply_attempt(self.progress, self.failed, username, success)
+        self.seq += 1
+        self.progress["journal_seq"] = self.seq
+        self.pending.append(json.dumps({
+            "seq": self.seq,
+            "username": username,
+            "success": success,
+            "reason": reason,
+            "at": datetime.now().isoformat()
+        }) + "\n")
+
+        if len(self.pending) >= self.group_size or clock.monotonic() - self.last_commit >= self.group_interval:
+            self.commit()
+        if self.since_compact >= self.compact_at:
+            self.compact()
+
+    def commit(self):
+        """Write pending records and their commit marker in one write, then fsync"""
+        self.last_commit = clock.monotonic()
+        if not self.pending:
+            return
+        started = time.perf_counter()
+        self.pending.append(json.dumps({"commit": self.seq}) + "\n")
+        self.file.write(''.join(self.pending))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        metrics.observe('x_dm_progress_commit_seconds', time.perf_counter() - started, store='json')
+        self.since_compact += len(self.pending) - 1
+        self.pending = []
+
+    def compact(self):
+        """Snapshot the full progress state and start an empty journal"""
+        if self.file:
+            self.commit()
+        save_progress(self.progress, self.failed)
+        with open(PROGRESS_JOURNAL_FILE, 'w') as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self.since_compact = 0
+        self.compact_at = self.compact_threshold()
+        logger.debug("Compacted progress journal at seq %d, next after %d attempts", self.seq, self.compact_at)
+
+    def compact_threshold(self):
+        """Attempts to journal before the next compaction, growing with the snapshot"""
+        snapshot_size = len(self.progress["messaged_usernames"]) + len(self.failed)
+        return max(self.compact_every, int(snapshot_size * JOURNAL_COMPACT_RATIO))
+
+    def iter_unmessaged(self, followers):
+        """Yield followers that haven't been messaged yet, in their original order"""
+        messaged_usernames = self.progress["messaged_usernames"]
+        # Usernames are case-insensitive on X. Most are stored lowercase, only the rest get a folded copy
+        folded = {u.lower() for u in messaged_usernames if not u.islower()}
+        for username in followers:
+            key = username.lower()
+            if key not in messaged_usernames and key not in folded:
+                yield username
+
+    def count_messaged(self):
+        """Number of users messaged across all runs"""
+        return len(self.progress["messaged_usernames"])
+
+    def count_failed(self):
+        """Number of distinct users with failed attempts that were never messaged"""
+        return len(set(self.failed) - self.progress["messaged_usernames"])
+
+    def close(self):
+        """Commit outstanding records and compact into the snapshot"""
+        if self.read_only:
+            return
+        self.commit()
+        self.compact()
+        self.file.close()
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    success INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    messaged_at TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    last_attempt_at TEXT,
+    last_reason TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_users_failed ON users(last_attempt_at)
+    WHERE messaged_at IS NULL AND failures > 0;
+CREATE INDEX IF NOT EXISTS idx_users_messaged_nocase ON users(username COLLATE NOCASE)
+    WHERE messaged_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER REFERENCES runs(id),
+    username TEXT NOT NULL,
+    at TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_username ON attempts(username, at);
+CREATE INDEX IF NOT EXISTS idx_attempts_run ON attempts(run_id);
+"""
+
+class SqliteProgressStore:
+    """Campaign state in SQLite: messaged/failed users, per-user attempt history and per-run stats"""
+
+    def __init__(self, path=PROGRESS_DB_FILE, group_size=1, auto_import=True, start_run=True, read_only=False):
+        is_new = not os.path.exists(path)
+        self.path = path
+        self.group_size = max(1, group_size)
+        self.pending = 0
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+            auto_import = start_run = False
+        else:
+            self.conn = sqlite3.connect(path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SQLITE_SCHEMA)
+        self.conn.execute("CREATE TEMP TABLE candidates (pos INTEGER PRIMARY KEY, username TEXT NOT NULL)")
+
+        if auto_import and is_new and (os.path.exists(PROGRESS_FILE) or os.path.exists(FAIL_FILE)):
+            logger.info(f"New state database {path}, carrying over existing JSON progress")
+            self.import_json()
+
+        self.run_id = None
+        if start_run:
+            self.run_id = self.conn.execute(
+                "INSERT INTO runs (started_at) VALUES (?)", (datetime.now().isoformat(),)
+            ).lastrowid
+            self.conn.commit()
+        logger.info(f"Using SQLite progress store {path} "
+                    f"({self.count_messaged()} messaged, {self.count_failed()} failed)")
+
+    def record(self, username, success, reason=None):
+        """Record one DM attempt for the current run"""
+        now = datetime.now().isoformat()
+        self.conn.execute(
+            "INSERT INTO attempts (run_id, username, at, success, reason) VALUES (?, ?, ?, ?, ?)",
+            (self.run_id, username, now, int(success), reason)
+        )
+        self.conn.execute("""
+            INSERT INTO users (username, messaged_at, attempts, failures, last_attempt_at, last_reason)
+            VALUES (?, ?, 1, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                messaged_at = COALESCE(users.messaged_at, excluded.messaged_at),
+                attempts = users.attempts + 1,
+                failures = users.failures + excluded.failures,
+                last_attempt_at = excluded.last_attempt_at,
+                last_reason = excluded.last_reason
+        """, (username, now if success else None, 0 if success else 1, now, reason))
+        column = "success" if success else "failed"
+        self.conn.execute(f"UPDATE runs SET {column} = {column} + 1 WHERE id = ?", (self.run_id,))
+
+        self.pending += 1
+        if self.pending >= self.group_size:
+            self.commit()
+
+    def commit(self):
+        """Commit pending attempts"""
+        started = time.perf_counter()
+        self.conn.commit()
+        metrics.observe('x_dm_progress_commit_seconds', time.perf_counter() - started, store='sqlite')
+        self.pending = 0
+
+    def is_messaged(self, username):
+        """Check whether a user has already been messaged"""
+        row = self.conn.execute(
+            "SELECT 1 FROM users WHERE username = ? COLLATE NOCASE AND messaged_at IS NOT NULL", (username,)
+        ).fetchone()
+        return row is not None
+
+    def iter_unmessaged(self, followers, chunk_size=10000):
+        """Yield followers that haven't been messaged yet, in their original order.
+
+        Followers are checked a chunk at a time with one indexed anti-join per chunk,
+        so memory stays bounded however long the input is. Names are compared
+        case-insensitively, like X does.
+        """
+        followers = iter(followers)
+        while True:
+            chunk = list(islice(followers, chunk_size))
+            if not chunk:
+                return
+            self.conn.execute("DELETE FROM candidates")
+            self.conn.executemany(
+                "INSERT INTO candidates (pos, username) VALUES (?, ?)", enumerate(chunk)
+            )
+            rows = self.conn.execute("""
+                SELECT c.username FROM candidates c
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM users u
+                    WHERE u.username = c.username COLLATE NOCASE AND u.messaged_at IS NOT NULL
+                )
+                ORDER BY c.pos
+            """).fetchall()
+            self.conn.execute("DELETE FROM candidates")
+            for row in rows:
+                yield row[0]
+
+    def count_messaged(self):
+        """Number of users messaged across all runs"""
+        return self.conn.execute("SELECT COUNT(*) FROM users WHERE messaged_at IS NOT NULL").fetchone()[0]
+
+    def count_failed(self):
+        """Number of users with failed attempts that were never messaged"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM users WHERE messaged_at IS NULL AND failures > 0"
+        ).fetchone()[0]
+
+    def attempt_history(self, username):
+        """List of (at, success, reason) for every attempt on a user, oldest first"""
+        return self.conn.execute(
+            "SELECT at, success, reason FROM attempts WHERE username = ? ORDER BY at", (username,)
+        ).fetchall()
+
+    def run_stats(self):
+        """List of (id, started_at, finished_at, success, failed) for every run"""
+        return self.conn.execute(
+            "SELECT id, started_at, finished_at, success, failed FROM runs ORDER BY id"
+        ).fetchall()
+
+    def import_json(self):
+        """Import messaged users and failed attempts from the JSON progress files"""
+        progress, failed = load_progress()
+        imported_at = progress.get("last_updated") or progress.get("started_at") or datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO users (username, messaged_at, attempts) VALUES (?, ?, 1)
+                ON CONFLICT(username) DO UPDATE SET
+                    messaged_at = COALESCE(users.messaged_at, excluded.messaged_at)
+            """, ((u, imported_at) for u in progress["messaged_usernames"]))
+            # One failed attempt per user in the fail list
+            self.conn.executemany("""
+                INSERT INTO users (username, attempts, failures, last_attempt_at) VALUES (?, 1, 1, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    attempts = users.attempts + 1,
+                    failures = users.failures + 1
+            """, ((u, imported_at) for u in failed))
+        logger.info(f"Imported {len(progress['messaged_usernames'])} messaged users "
+                    f"and {len(failed)} failed attempts from JSON")
+
+    def export_json(self):
+        """Write the store back out as messaged_followers.json and messaged_fail.json"""
+        messaged = [row[0] for row in self.conn.execute(
+            "SELECT username FROM users WHERE messaged_at IS NOT NULL ORDER BY messaged_at, username"
+        )]
+        failed = [row[0] for row in self.conn.execute(
+            "SELECT username FROM users WHERE messaged_at IS NULL AND failures > 0 ORDER BY last_attempt_at"
+        )]
+        first_run = self.conn.execute("SELECT MIN(started_at) FROM runs").fetchone()[0]
+        progress = {
+            "messaged_usernames": messaged,
+            "started_at": first_run or datetime.now().isoformat(),
+            "last_updated": datetime.now().isoformat(),
+            "stats": {"success": len(messaged), "failed": len(failed)},
+            "failed_count": len(failed)
+        }
+        write_json_atomic(FAIL_FILE, failed)
+        write_json_atomic(PROGRESS_FILE, progress)
+        # The exported snapshot supersedes anything left in the JSON journal
+        if os.path.exists(PROGRESS_JOURNAL_FILE):
+            os.remove(PROGRESS_JOURNAL_FILE)
+        logger.info(f"Exported {len(messaged)} messaged and {len(failed)} failed users to JSON")
+
+    def close(self):
+        """Commit outstanding attempts and close out the current run"""
+        if self.run_id is not None:
+            self.conn.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (datetime.now().isoformat(), self.run_id))
+        self.commit()
+        self.conn.close()
+
+def open_progress_store(options, read_only=False):
+    """Open the configured progress store ('json' journal or 'sqlite')"""
+    if options['progress_store'] == 'sqlite':
+        # A database that doesn't exist yet would be seeded from the JSON files, so read those instead
+        if not (read_only and not os.path.exists(options['progress_db'])):
+            return SqliteProgressStore(options['progress_db'], group_size=options['progress_group_size'],
+                                       read_only=read_only)
 
     progress, failed = load_progress()
-    followers_to_message = [f for f in followers if f not in progress["messaged_usernames"]]
+    return ProgressJournal(
+        progress, failed,
+        group_size=options['progress_group_size'],
+        group_interval=options['progress_group_interval'],
+        compact_every=options['progress_compact_every'],
+        read_only=read_only
+    )
 
-    messaged = message_followers(config, followers_to_message)
-    progress["messaged_usernames"].extend(messaged)
+def extension_patterns(*extensions):
+    """URL patterns matching files with these extensions, with or without a query string"""
+    return [pattern for ext in extensions for pattern in (f"*.{ext}", f"*.{ext}?*")]
 
-    save_progress(progress, failed)
-    logger.info("Finished messaging followers.")
+# URL patterns per resource category for Network.setBlockedURLs ('*' is a wildcard).
+# X serves images and video from twimg hosts without file extensions, so those are matched by host/path
+RESOURCE_BLOCK_PATTERNS = {
+    'image': ['*pbs.twimg.com/profile_images/*', '*pbs.twimg.com/profile_banners/*', '*pbs.twimg.com/media/*',
+              '*pbs.twimg.com/card_img/*', '*abs.twimg.com/emoji/*']
+             + extension_patterns('png', 'jpg', 'jpeg', 'gif', 'webp'),
+    'media': ['*video.twimg.com/*'] + extension_patterns('mp4', 'm3u8', 'm4s', 'webm'),
+    'font': extension_patterns('woff', 'woff2', 'ttf', 'otf'),
+}
 
-    with open(FAIL_FILE, 'w') as f:
-        json.dump(failed, f)
-    logger.info(f"Failed attempts saved - Total Failed: {len(failed)}")
+# Bytes and timings of the current page from the Performance API. Resource timings are cleared
+# afterwards so the next call only counts what was loaded since. Cross-origin responses without a
+# Timing-Allow-Origin header report a transferSize of 0, so treat bytes as a lower bound
+PAGE_STATS_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = 0;
+for (var i = 0; i < resources.length; i++) { bytes += resources[i].transferSize || 0; }
+var stats = {
+    bytes: bytes + (nav && !window.__xdmNavCounted ? nav.transferSize : 0),
+    resources: resources.length,
+    dom_ready_ms: nav && !window.__xdmNavCounted ? Math.round(nav.domContentLoadedEventEnd) : null
+};
+window.__xdmNavCounted = true;
+performance.clearResourceTimings();
+return stats;
+"""
 
-def setup_driver(headless=True):
-    """Set up and return a configured webdriver"""
+def resource_block_patterns(block_resources):
+    """Expand resource categories into URL patterns, anything else is used as a pattern as-is"""
+    patterns = []
+    for entry in block_resources or []:
+        patterns.extend(RESOURCE_BLOCK_PATTERNS.get(entry, [entry]))
+    return patterns
+
+def apply_resource_policy(driver, block_resources):
+    """Block the configured resources for every page the driver loads, using CDP"""
+    patterns = resource_block_patterns(block_resources)
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        logger.info(f"Blocking {', '.join(block_resources)} requests ({len(patterns)} URL patterns)")
+    except Exception as e:
+        logger.warning(f"Could not set up request blocking, loading all resources: {e}")
+
+def record_page_stats(driver, span):
+    """Add bytes transferred, resource count and DOMContentLoaded time of the current page to span"""
+    try:
+        stats = driver.execute_script(PAGE_STATS_JS)
+    except Exception as e:
+        logger.debug("Could not read page stats: %s", e)
+        return
+    if stats:
+        span.attrs.update(stats)
+        logger.debug("Page loaded %.1f KB in %d resources", stats['bytes'] / 1024, stats['resources'])
+
+def setup_driver(headless=True, profile_dir=None, block_resources=None):
+    """Set up and return a configured webdriver, optionally on a persistent Chrome profile"""
+    import_selenium()
     logger.info(f"Setting up Chrome driver (headless={headless})")
     options = webdriver.ChromeOptions()
     
+    # A persistent user-data dir keeps cookies, so the X session survives between runs
+    if profile_dir:
+        logger.info(f"Using persistent Chrome profile {profile_dir}")
+        options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+    
     if headless:
         # Fix for "DevToolsActivePort file doesn't exist" error
         options.add_argument("--headless=new")
@@ -181,6 +1225,7 @@ def setup_driver(headless=True):
     try:
         driver = webdriver.Chrome(options=options)
         logger.info("Chrome driver initialized successfully")
+        apply_resource_policy(driver, block_resources)
         return driver
     except Exception as e:
         logger.error(f"Failed to initialize Chrome driver: {e}")
@@ -189,11 +1234,14 @@ def setup_driver(headless=True):
         if headless:
             logger.info("Trying to initialize Chrome in non-headless mode as fallback")
             options = webdriver.ChromeOptions()
+            if profile_dir:
+                options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
             options.add_argument("--no-sandbox")
             options.add_argument("--disable-notifications")
             options.add_argument("--start-maximized")
             driver = webdriver.Chrome(options=options)
             logger.info("Chrome driver initialized in non-headless mode")
+            apply_resource_policy(driver, block_resources)
             return driver
         else:
             raise
@@ -201,7 +1249,7 @@ def setup_driver(headless=True):
 def login_to_x(driver, username, password, options):
     """Login to X account"""
     logger.info(f"Attempting to login as @{username}")
-    driver.get("https://x.com/login")
+    driver.get(f"{X_BASE_URL}/login")
     
     try:
         # Wait for login form
@@ -247,549 +1295,1399 @@ def login_to_x(driver, username, password, options):
         logger.error(f"⚠️ LOGIN FAILED: {e}")
         # Save screenshot for debugging login issues
         if options['take_screenshots']:
-            try:
-                screenshot_file = f"login_error_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                driver.save_screenshot(screenshot_file)
-                logger.info(f"Screenshot saved as {screenshot_file}")
-            except:
-                logger.error("Failed to save screenshot")
+            take_screenshot(driver, "login_error", failure=True)
+        return False
+
+# Common non-profile pages to filter out
+EXCLUDED_PAGES = ['tos', 'privacy', 'about', 'help', 'explore', 'notifications',
+                  'home', 'i', 'messages', 'settings', 'search', 'compose', 'status']
+
+# Collects profile usernames from all rendered follower cells, then scrolls.
+# Falls back to every profile link in the followers section when no UserCell is found.
+# Used when the incremental collector below hasn't seen any cells.
+EXTRACT_FOLLOWERS_JS = """
+    var excluded = arguments[0];
+    var usernames = [];
+    var seen = {};
+    
+    function addFromLink(link) {
+        var href = link.href;
+        if (!href || href.indexOf('/status/') !== -1 || href.indexOf('/i/') !== -1 ||
+            href.indexOf('/search') !== -1) {
+            return;
+        }
+        if (href.indexOf(location.origin + '/') !== 0) {
+            return;
+        }
+        var username = link.pathname.split('/')[1];
+        if (username && excluded.indexOf(username) === -1 && !seen[username]) {
+            seen[username] = true;
+            usernames.push(username);
+        }
+    }
+    
+    var timeline = document.querySelector('[data-testid="primaryColumn"]');
+    var cells = timeline ? timeline.querySelectorAll('[data-testid="UserCell"]') : [];
+    var links;
+    if (cells.length > 0) {
+        for (var i = 0; i < cells.length; i++) {
+            links = cells[i].querySelectorAll('a');
+            for (var j = 0; j < links.length; j++) {
+                addFromLink(links[j]);
+            }
+        }
+    } else {
+        var section = document.querySelector('[data-testid="primaryColumn"] > div');
+        var sections = document.querySelectorAll('section');
+        for (var k = 0; k < sections.length; k++) {
+            if (sections[k].querySelectorAll('[data-testid="UserCell"]').length > 0) {
+                section = sections[k];
+                break;
+            }
+        }
+        links = section ? section.querySelectorAll('a') : [];
+        for (var m = 0; m < links.length; m++) {
+            addFromLink(links[m]);
+        }
+    }
+    
+    window.scrollTo(0, document.body.scrollHeight);
+    return usernames;
+"""
+
+# Installs (once per page) a MutationObserver that buffers usernames from newly rendered
+# follower cells, then drains the buffer and scrolls. Per call cost depends on the
+# cells rendered since the last call, not on everything in the DOM.
+FOLLOWER_COLLECTOR_JS = """
+    var excluded = arguments[0];
+    var collector = window.__xdmFollowerCollector;
+    
+    if (!collector) {
+        collector = {buffer: [], seen: {}, cells: 0};
+        
+        collector.addCell = function(cell) {
+            collector.cells++;
+            var links = cell.querySelectorAll('a');
+            for (var i = 0; i < links.length; i++) {
+                var href = links[i].href;
+                if (!href || href.indexOf(location.origin + '/') !== 0 ||
+                    href.indexOf('/status/') !== -1 || href.indexOf('/i/') !== -1 ||
+                    href.indexOf('/search') !== -1) {
+                    continue;
+                }
+                var username = links[i].pathname.split('/')[1];
+                if (username && excluded.indexOf(username) === -1 && !collector.seen[username]) {
+                    collector.seen[username] = true;
+                    collector.buffer.push(username);
+                }
+            }
+        };
+        
+        collector.scan = function(node) {
+            if (node.nodeType !== 1 || !node.closest('[data-testid="primaryColumn"]')) {
+                return;
+            }
+            // A cell that renders in pieces gets its links added inside it, rescan the
+            // whole cell (seen drops the usernames already collected)
+            var cell = node.closest('[data-testid="UserCell"]');
+            if (cell) {
+                collector.addCell(cell);
+                return;
+            }
+            var cells = node.querySelectorAll('[data-testid="UserCell"]');
+            for (var i = 0; i < cells.length; i++) {
+                collector.addCell(cells[i]);
+            }
+        };
+        
+        // Pick up whatever is already rendered, then only new nodes from here on
+        var column = document.querySelector('[data-testid="primaryColumn"]');
+        if (column) {
+            collector.scan(column);
+        }
+        collector.observer = new MutationObserver(function(mutations) {
+            for (var i = 0; i < mutations.length; i++) {
+                var added = mutations[i].addedNodes;
+                for (var j = 0; j < added.length; j++) {
+                    collector.scan(added[j]);
+                }
+            }
+        });
+        collector.observer.observe(document.body, {childList: true, subtree: true});
+        window.__xdmFollowerCollector = collector;
+    }
+    
+    var batch = collector.buffer;
+    collector.buffer = [];
+    window.scrollTo(0, document.body.scrollHeight);
+    return {usernames: batch, cells: collector.cells};
+"""
+
+def load_followers_checkpoint(account_name):
+    """Return the checkpoint of an unfinished follower collection for this account, if any"""
+    if not os.path.exists(FOLLOWERS_CHECKPOINT_FILE) or not os.path.exists(FOLLOWERS_LIST_FILE):
+        return None
+    try:
+        with open(FOLLOWERS_CHECKPOINT_FILE, 'r') as f:
+            checkpoint = json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable {FOLLOWERS_CHECKPOINT_FILE}: {e}")
+        return None
+    if checkpoint.get("account") != account_name or checkpoint.get("complete"):
+        return None
+    return checkpoint
+
+def is_logged_in(driver, timeout):
+    """Quick check whether the browser already has a logged-in X session"""
+    driver.get(f"{X_BASE_URL}/home")
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.2).until(
+            lambda d: '/login' in d.current_url or d.find_elements(By.CSS_SELECTOR, "[data-testid='primaryColumn']")
+        )
+    except TimeoutException:
         return False
+    return '/login' not in driver.current_url and bool(
+        driver.find_elements(By.CSS_SELECTOR, "[data-testid='primaryColumn']")
+    )
+
+def ensure_logged_in(driver, username, password, options):
+    """Reuse the saved session when there is one, otherwise go through the full login"""
+    if options['chrome_profile_dir']:
+        with tracer.span('session_check') as span:
+            reused = is_logged_in(driver, options['session_check_timeout'])
+            span.outcome = 'reused' if reused else 'expired'
+        if reused:
+            logger.info("🔓 SESSION REUSED: Already logged in from the saved Chrome profile")
+            return True
+        logger.info("No saved session found, logging in")
+    
+    with tracer.span('login') as span:
+        logged_in = login_to_x(driver, username, password, options)
+        span.outcome = 'ok' if logged_in else 'failed'
+    return logged_in
+
+def process_tree_rss_mb(root_pid):
+    """Resident memory of a process and all its descendants in MB, None if it can't be measured.
+    
+    Shared pages are counted once per process, so this overestimates, which is fine for a limit.
+    """
+    if psutil is not None:
+        try:
+            root = psutil.Process(root_pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return total / 1024 / 1024
+    
+    # Without psutil, read the process tree from /proc (Linux only)
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    
+    total_kb = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return total_kb / 1024
+
+class BrowserWatchdog:
+    """Samples Chrome's memory between followers and says when the driver should be recycled"""
+
+    def __init__(self, options):
+        self.max_rss_mb = options['browser_max_rss_mb']
+        self.max_js_heap_mb = options['browser_max_js_heap_mb']
+        self.recycle_every = options['browser_recycle_every']
+        self.check_every = max(1, options['browser_check_every'])
+        self.followers = 0  # Followers handled by the current driver
+        self.metrics_enabled = False
+
+    @property
+    def enabled(self):
+        return bool(self.max_rss_mb or self.max_js_heap_mb or self.recycle_every)
+
+    def reset(self):
+        """Start counting again for a fresh driver"""
+        self.followers = 0
+        self.metrics_enabled = False
+
+    def js_heap_mb(self, driver):
+        """Used JS heap of the current page in MB from CDP Performance.getMetrics"""
+        if not self.metrics_enabled:
+            driver.execute_cdp_cmd('Performance.enable', {})
+            self.metrics_enabled = True
+        metrics = driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+        for metric in metrics:
+            if metric['name'] == 'JSHeapUsedSize':
+                return metric['value'] / 1024 / 1024
+        return None
+
+    def sample(self, driver):
+        """Browser process tree RSS and JS heap in MB (either may be None)"""
+        try:
+            rss_mb = process_tree_rss_mb(driver.service.process.pid)
+        except AttributeError:
+            rss_mb = None
+        try:
+            js_heap_mb = self.js_heap_mb(driver)
+        except Exception as e:
+            logger.debug("Could not read JS heap size: %s", e)
+            js_heap_mb = None
+        return rss_mb, js_heap_mb
+
+    def check(self, driver):
+        """Call after each follower, returns why the driver should be recycled or None"""
+        if not self.enabled and not metrics.enabled:
+            return None
+        self.followers += 1
+        if self.recycle_every and self.followers >= self.recycle_every:
+            return f"{self.followers} followers since the browser started"
+        if self.followers % self.check_every:
+            return None
+        
+        with tracer.span('browser_memory') as span:
+            # With only metrics on, sample for the gauges but never recycle
+            if self.enabled:
+                try:
+                    driver.title  # A crashed or hung browser fails here
+                except Exception as e:
+                    span.outcome = 'unresponsive'
+                    return f"browser not responding ({type(e).__name__})"
+            rss_mb, js_heap_mb = self.sample(driver)
+            span.attrs.update(rss_mb=rss_mb, js_heap_mb=js_heap_mb)
+        metrics.set('x_dm_browser_rss_bytes', rss_mb and int(rss_mb * 1024 * 1024))
+        metrics.set('x_dm_browser_js_heap_bytes', js_heap_mb and int(js_heap_mb * 1024 * 1024))
+        
+        logger.info("Browser memory: RSS %.0f MB, JS heap %.0f MB", rss_mb or 0, js_heap_mb or 0)
+        if not self.enabled:
+            return None
+        if self.max_rss_mb and rss_mb and rss_mb > self.max_rss_mb:
+            return f"browser RSS {rss_mb:.0f} MB over {self.max_rss_mb} MB"
+        if self.max_js_heap_mb and js_heap_mb and js_heap_mb > self.max_js_heap_mb:
+            return f"JS heap {js_heap_mb:.0f} MB over {self.max_js_heap_mb} MB"
+        return None
+
+def recycle_driver(driver, headless, username, password, options, reason):
+    """Quit the driver and start a fresh logged-in one, None if logging back in fails"""
+    logger.info(f"♻️ RECYCLING BROWSER: {reason}")
+    metrics.inc('x_dm_browser_recycles_total')
+    with tracer.span('recycle_browser', reason=reason) as span:
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing the old browser: {e}")
+        
+        try:
+            driver = setup_driver(headless=headless, profile_dir=options['chrome_profile_dir'],
+                                  block_resources=options['block_resources'])
+        except Exception as e:
+            span.outcome = 'failed'
+            logger.error(f"Failed to restart the browser: {e}")
+            return None
+        if not ensure_logged_in(driver, username, password, options):
+            span.outcome = 'failed'
+            logger.error("Could not log back in after restarting the browser")
+            driver.quit()
+            return None
+    return driver
 
 def get_followers(driver, account_name, options):
-    """Get list of followers"""
+    """Get list of followers, streaming them to followers_list.txt and resuming unfinished runs"""
     logger.info(f"Getting followers for @{account_name}...")
-    driver.get(f"https://x.com/{account_name}/followers")
+    
+    # Insertion-ordered set of follower usernames
+    followers = {}
+    checkpoint = None
+    if options['resume_follower_collection']:
+        checkpoint = load_followers_checkpoint(account_name)
+    
+    if checkpoint:
+        with open(FOLLOWERS_LIST_FILE, 'r') as f:
+            followers = dict.fromkeys(line.strip() for line in f if line.strip())
+        logger.info(f"Resuming follower collection started at {checkpoint['started_at']} "
+                    f"with {len(followers)} followers already collected")
+    else:
+        checkpoint = {"account": account_name, "started_at": datetime.now().isoformat(), "scrolls": 0}
+    checkpoint["complete"] = False
     
     # Wait for the page to fully load
     logger.info("Waiting for followers page to load...")
     try:
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='primaryColumn']"))
-        )
+        with tracer.span('followers_page') as span:
+            driver.get(f"{X_BASE_URL}/{account_name}/followers")
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='primaryColumn']"))
+            )
+            record_page_stats(driver, span)
         time.sleep(5)  # Give extra time for the page to load completely
     except TimeoutException:
         logger.error("Timed out waiting for followers page to load")
+        take_dom_snapshot(driver, "followers_error", failure=True)
         return []
     
     # Take screenshot of the followers page for debugging
     if options['take_screenshots']:
-        debug_screenshot = f"followers_page_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        driver.save_screenshot(debug_screenshot)
-        logger.info(f"Followers page screenshot saved as {debug_screenshot}")
+        take_screenshot(driver, "followers_page")
+    take_dom_snapshot(driver, "followers_page")
     
-    # Initialize list to store follower usernames
-    followers = []
-    previous_count = 0
+    previous_count = len(followers)
     no_change_count = 0
     max_no_change = 5  # If we see no new followers for this many scrolls, we stop
-    scroll_count = 0
-    max_scrolls = 100  # Maximum number of scrolls to prevent infinite loops
+    scroll_count = checkpoint["scrolls"]
+    max_scrolls = options['followers_max_scrolls']  # Maximum number of scrolls to prevent infinite loops
+    error_count = 0
+    # When resuming, scroll quickly past the followers we already have
+    catching_up = len(followers) > 0
     
-    logger.info("Starting to scroll and collect followers...")
+    # New usernames are appended as they are found so a crash loses at most one scroll
+    list_file = open(FOLLOWERS_LIST_FILE, 'a' if followers else 'w')
+    write_json_atomic(FOLLOWERS_CHECKPOINT_FILE, checkpoint)
     
-    # Common non-profile pages to filter out
-    excluded_pages = ['tos', 'privacy', 'about', 'help', 'explore', 'notifications', 
-                      'home', 'i', 'messages', 'settings', 'search', 'compose', 'status']
+    logger.info("Starting to scroll and collect followers...")
     
-    while no_change_count < max_no_change and scroll_count < max_scrolls:
-        scroll_count += 1
-        found_new = False
-        
-        # First try to get all user cells within the followers section only
-        try:
-            # Look specifically for the main timeline section which contains the followers
-            timeline = driver.find_element(By.CSS_SELECTOR, "[data-testid='primaryColumn']")
-            
-            # Find user cells only within the main timeline
-            user_cells = timeline.find_elements(By.CSS_SELECTOR, "[data-testid='UserCell']")
-            logger.debug(f"Found {len(user_cells)} user cells in the followers section")
+    try:
+        while no_change_count < max_no_change and scroll_count < max_scrolls:
+            found_new = False
+            rendered = False
+            new_usernames = []
             
-            for cell in user_cells:
-                try:
-                    # Look for the link with username within the cell
-                    links = cell.find_elements(By.TAG_NAME, "a")
-                    for link in links:
-                        href = link.get_attribute('href')
-                        if href and href.startswith('https://x.com/'):
-                            username = href.split('/')[-1]
-                            
-                            # Filter out non-profile paths
-                            if (username and username not in excluded_pages and 
-                                not any(excluded in href for excluded in ['/status/', '/i/', '/search'])):
-                                if username not in followers:
-                                    followers.append(username)
-                                    found_new = True
-                except Exception as e:
-                    logger.debug(f"Error extracting username from cell: {e}")
-                    continue
-                    
-            # If we didn't find any user cells via the direct approach, try a more targeted approach
-            if len(user_cells) == 0:
-                # Try to identify the main section containing followers (usually a section role or specific div)
-                followers_section = driver.execute_script("""
-                    // First try to find the main followers section
-                    var sections = document.querySelectorAll('section');
-                    var followersSection = null;
-                    
-                    // Iterate through sections to find the one with follower cells
-                    for (var i = 0; i < sections.length; i++) {
-                        // Check if this section contains UserCell elements
-                        if (sections[i].querySelectorAll('[data-testid="UserCell"]').length > 0) {
-                            return sections[i];
-                        }
-                    }
+            # Drain usernames from newly rendered cells and scroll, all in one round-trip
+            try:
+                with tracer.span('followers_scroll'):
+                    batch = driver.execute_script(FOLLOWER_COLLECTOR_JS, EXCLUDED_PAGES)
+                    usernames = batch['usernames']
                     
-                    // If no sections found with UserCells, try to find the timeline
-                    return document.querySelector('[data-testid="primaryColumn"] > div');
-                """)
+                    # No UserCell seen at all, fall back to scanning every link in the followers section
+                    if batch['cells'] == 0:
+                        usernames = driver.execute_script(EXTRACT_FOLLOWERS_JS, EXCLUDED_PAGES)
                 
-                if followers_section:
-                    # Now extract usernames from the followers section
-                    usernames = driver.execute_script("""
-                        var section = arguments[0];
-                        var usernames = [];
-                        
-                        // Get all profile links in this section
-                        var links = section.querySelectorAll('a');
-                        for (var i = 0; i < links.length; i++) {
-                            var href = links[i].getAttribute('href');
-                            if (href && href.startsWith('/')) {
-                                var username = href.substring(1).split('/')[0];
-                                // Make sure it's not empty and not a system page
-                                if (username && !['tos', 'privacy', 'about', 'help', 'explore', 
-                                                 'notifications', 'home', 'i', 'messages', 
-                                                 'settings', 'search', 'compose', 'status'].includes(username)) {
-                                    usernames.push(username);
-                                }
-                            }
-                        }
-                        return usernames;
-                    """, followers_section)
-                    
-                    if usernames:
-                        for username in usernames:
-                            if username not in followers:
-                                followers.append(username)
-                                found_new = True
-        except Exception as e:
-            logger.debug(f"Error finding UserCell elements: {e}")
-        
-        # Break if no new followers loaded after scrolling multiple times
-        if not found_new:
-            no_change_count += 1
-            logger.info(f"No new followers found after scroll. Attempt {no_change_count}/{max_no_change}")
-        else:
-            no_change_count = 0
+                for username in usernames or []:
+                    rendered = True
+                    if username not in followers:
+                        followers[username] = None
+                        found_new = True
+                        # Filter out system pages or non-profile links that might have been captured
+                        if username not in EXCLUDED_PAGES and len(username) > 1:
+                            new_usernames.append(username)
+                error_count = 0
+            except Exception as e:
+                error_count += 1
+                logger.debug("Error extracting usernames from follower cells: %s", e)
             
-        # Log progress
-        if len(followers) != previous_count:
-            logger.info(f"Found {len(followers)} followers so far...")
-            previous_count = len(followers)
-        
-        # Scroll down
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(3)  # Increased wait time after scrolling
-        
-        # Every 10 scrolls, take a screenshot
-        if options['take_screenshots'] and scroll_count % 10 == 0:
-            scroll_screenshot = f"scroll_{scroll_count}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            driver.save_screenshot(scroll_screenshot)
-            logger.info(f"Scroll screenshot saved as {scroll_screenshot}")
-    
-    # Filter out any remaining system pages or non-profile links that might have been captured
-    valid_followers = [f for f in followers if f not in excluded_pages and len(f) > 1]
-    
+            if found_new and catching_up:
+                logger.info("Caught up with previously collected followers after %d scrolls", scroll_count)
+                catching_up = False
+            
+            # Catch-up scrolls don't count against the scroll limit
+            if not catching_up:
+                scroll_count += 1
+            
+            if new_usernames:
+                list_file.write(''.join(f"{username}\n" for username in new_usernames))
+                list_file.flush()
+            
+            # Break if no new followers loaded after scrolling multiple times
+            if not found_new and not (catching_up and rendered):
+                no_change_count += 1
+                logger.info("No new followers found after scroll. Attempt %d/%d", no_change_count, max_no_change)
+            else:
+                no_change_count = 0
+                
+            # Log progress and checkpoint
+            if len(followers) != previous_count:
+                logger.info("Found %d followers so far...", len(followers))
+                previous_count = len(followers)
+                checkpoint["scrolls"] = scroll_count
+                checkpoint["count"] = len(followers)
+                checkpoint["updated_at"] = datetime.now().isoformat()
+                write_json_atomic(FOLLOWERS_CHECKPOINT_FILE, checkpoint)
+            
+            # The extraction script already scrolled, give the next batch time to render
+            time.sleep(min(1, options['scroll_pause']) if catching_up else options['scroll_pause'])
+            
+            # Every 10 scrolls, take a screenshot
+            if options['take_screenshots'] and scroll_count % 10 == 0 and not catching_up:
+                take_screenshot(driver, f"scroll_{scroll_count}")
+    finally:
+        list_file.close()
+    
+    valid_followers = [f for f in followers if f not in EXCLUDED_PAGES and len(f) > 1]
+    
+    # If the loop only stopped because the browser stopped answering, leave the
+    # checkpoint open so the next run picks up from here
+    if error_count >= max_no_change:
+        logger.error(f"Follower collection interrupted by errors, {len(valid_followers)} followers "
+                     f"checkpointed in {FOLLOWERS_LIST_FILE} for the next run")
+    else:
+        checkpoint["complete"] = True
+        checkpoint["count"] = len(followers)
+        checkpoint["updated_at"] = datetime.now().isoformat()
+        write_json_atomic(FOLLOWERS_CHECKPOINT_FILE, checkpoint)
+    
     if valid_followers:
         logger.info(f"✅ FOLLOWERS COLLECTED: Found total of {len(valid_followers)} followers")
+        logger.info(f"Saved followers list to {FOLLOWERS_LIST_FILE}")
     else:
         logger.error("⚠️ NO FOLLOWERS FOUND: Check if the account has followers or try running in non-headless mode")
-    
-    # Save the list of followers to a file for review
-    try:
-        with open("followers_list.txt", "w") as f:
-            for follower in valid_followers:
-                f.write(f"{follower}\n")
-        logger.info("Saved followers list to followers_list.txt")
-    except Exception as e:
-        logger.error(f"Error saving followers list: {e}")
+        take_dom_snapshot(driver, "followers_error", failure=True)
     
     return valid_followers
 
-# Replacement for your send_dm function with better button handling
-def send_dm(driver, username, message, options):
-    """Send DM to a specific user with verification of success"""
-    logger.info(f"Attempting to send DM to @{username}...")
+# Readiness conditions polled by send_dm instead of fixed sleeps
+PROFILE_READY_JS = """
+    return !!(document.querySelector('[data-testid="sendDMFromProfile"]') ||
+              document.querySelector('[data-testid="userActions"]') ||
+              document.querySelector('[data-testid="placementTracking"]'));
+"""
+
+SEND_READY_JS = """
+    var button = document.querySelector('[data-testid="dmComposerSendButton"]');
+    return !!button && !button.disabled && button.getAttribute('aria-disabled') !== 'true';
+"""
+
+# In-app navigation: push the profile path and let X's client-side router render it
+SPA_NAVIGATE_JS = """
+    if (!document.querySelector('#react-root, [data-testid="primaryColumn"]')) {
+        return false;
+    }
+    window.history.pushState({}, '', '/' + arguments[0]);
+    window.dispatchEvent(new PopStateEvent('popstate', {state: {}}));
+    return true;
+"""
+
+# The router has rendered @username's profile and no conversation from the previous
+# follower is still on the page (a leftover composer would get the next message)
+SPA_PROFILE_READY_JS = """
+    if (document.querySelector('[data-testid="dmComposerTextInput"], [data-testid="DMDrawer"]')) {
+        return false;
+    }
+    var handle = '@' + arguments[0].toLowerCase();
+    var name = document.querySelector('[data-testid="UserName"]');
+    return !!name && Array.prototype.some.call(name.querySelectorAll('span'), function(span) {
+        return span.textContent.trim().toLowerCase() === handle;
+    });
+"""
+
+# Replace the composer's content with the whole message in one call. Rich text editors
+# like X's handle a paste event themselves; a plain contenteditable gets insertText,
+# which also fires the input events that enable the send button
+INSERT_MESSAGE_JS = """
+    var element = arguments[0], text = arguments[1];
+    element.focus();
+    var range = document.createRange();
+    range.selectNodeContents(element);
+    var selection = window.getSelection();
+    selection.removeAllRanges();
+    selection.addRange(range);
+    var data = new DataTransfer();
+    data.setData('text/plain', text);
+    var handled = !element.dispatchEvent(new ClipboardEvent('paste', {
+        clipboardData: data, bubbles: true, cancelable: true
+    }));
+    if (handled) {
+        return 'paste';
+    }
+    document.execCommand('insertText', false, text);
+    return 'insertText';
+"""
+
+READ_MESSAGE_JS = "return arguments[0].innerText || arguments[0].textContent || '';"
+
+# The profile rendered its actions but there is no Message button: the user doesn't accept DMs from us
+DMS_CLOSED_JS = """
+    return !!(document.querySelector('[data-testid="userActions"]') ||
+              document.querySelector('[data-testid="placementTracking"]')) &&
+           !document.querySelector('[data-testid="sendDMFromProfile"]');
+"""
+
+def dms_closed(driver, options):
+    """True if the profile still shows its actions without a Message button after a short grace period"""
+    # The actions can render a tick before the Message button, don't cache a follower as closed for that
+    try:
+        WebDriverWait(driver, options['dms_closed_grace'], poll_frequency=0.2).until(
+            lambda d: not d.execute_script(DMS_CLOSED_JS)
+        )
+        return False
+    except TimeoutException:
+        return True
+
+# Our text is still sitting in the composer, so the send didn't go out
+STILL_IN_COMPOSER_JS = """
+    var composer = document.querySelector('[data-testid="dmComposerTextInput"]') ||
+                   document.querySelector('div[role="textbox"][contenteditable="true"]');
+    return !!composer && (composer.textContent || '').indexOf(arguments[0]) !== -1;
+"""
+
+# Looks for the snippet only inside the conversation, not the whole document. Returns
+# 'found' once it is there and no longer in the composer, 'empty' if the composer was
+# cleared but the conversation isn't recognizable, otherwise null to keep polling.
+VERIFY_SENT_JS = """
+    var snippet = arguments[0];
+    var composer = document.querySelector('[data-testid="dmComposerTextInput"]') ||
+                   document.querySelector('div[role="textbox"][contenteditable="true"]');
+    var composerText = composer ? (composer.textContent || '') : '';
+    if (composerText.indexOf(snippet) !== -1) {
+        return null;
+    }
+    var containers = ['[data-testid="DmActivityViewport"]', '[data-testid="DmActivityContainer"]',
+                      '[data-testid="DMDrawer"]', '[data-testid="DmScrollerContainer"]'];
+    for (var i = 0; i < containers.length; i++) {
+        var container = document.querySelector(containers[i]);
+        if (container && (container.textContent || '').indexOf(snippet) !== -1) {
+            return 'found';
+        }
+    }
+    if (composer && composerText.trim() === '') {
+        return 'empty';
+    }
+    return null;
+"""
+
+# Locator strategies for send_dm. Each returns something truthy on success and
+# None/False when its target isn't there; LocatorRegistry decides the order.
+
+def message_button_by_testid(driver, options):
+    """Message button by data-testid"""
+    message_button = WebDriverWait(driver, 5).until(
+        EC.element_to_be_clickable((By.XPATH, "//button[@data-testid='sendDMFromProfile']"))
+    )
+    driver.execute_script("arguments[0].click();", message_button)
+    logger.info("Found message button with data-testid")
+    return True
+
+def message_button_by_aria_label(driver, options):
+    """Message button by aria-label"""
+    message_button = WebDriverWait(driver, 5).until(
+        EC.element_to_be_clickable((By.XPATH, "//button[contains(@aria-label, 'Message')]"))
+    )
+    driver.execute_script("arguments[0].click();", message_button)
+    logger.info("Found message button with aria-label")
+    return True
+
+def message_button_by_text(driver, options):
+    """Any button whose text mentions 'message', found with JavaScript"""
+    message_clicked = driver.execute_script("""
+        var buttons = document.querySelectorAll('button, div[role="button"]');
+        for (var i = 0; i < buttons.length; i++) {
+            if (buttons[i].textContent.toLowerCase().includes('message')) {
+                buttons[i].click();
+                return true;
+            }
+        }
+        return false;
+    """)
+    if message_clicked:
+        logger.info("Found and clicked message button with JavaScript")
+    return message_clicked
+
+def message_button_from_user_actions(driver, options):
+    """First button in the user actions area"""
+    clicked = driver.execute_script("""
+        var userActions = document.querySelector('div[data-testid="userActions"]');
+        if (userActions) {
+            var buttons = userActions.querySelectorAll('div[role="button"]');
+            if (buttons.length > 0) {
+                buttons[0].click();
+                return true;
+            }
+        }
+        return false;
+    """)
+    if clicked:
+        logger.info("Clicked first button in user actions area")
+    return clicked
+
+def composer_input_by_testid(driver, options):
+    """DM composer input by data-testid"""
+    message_input = WebDriverWait(driver, options['composer_timeout'], poll_frequency=0.2).until(
+        EC.presence_of_element_located((By.XPATH, "//div[@data-testid='dmComposerTextInput']"))
+    )
+    logger.info("Found message input with data-testid")
+    return message_input
+
+def composer_input_by_contenteditable(driver, options):
+    """Contenteditable textbox"""
+    message_input = WebDriverWait(driver, 5).until(
+        EC.presence_of_element_located((By.XPATH, "//div[@role='textbox' and @contenteditable='true']"))
+    )
+    logger.info("Found message input with contenteditable attribute")
+    return message_input
+
+def composer_input_by_js(driver, options):
+    """Any contenteditable element, found with JavaScript"""
+    message_input = driver.execute_script("""
+        return document.querySelector('div[contenteditable="true"]');
+    """)
+    if message_input:
+        logger.info("Found message input with JavaScript")
+    return message_input
+
+def send_button_by_testid(driver, options, message_input):
+    """Send button by data-testid"""
+    send_button = WebDriverWait(driver, 5).until(
+        EC.element_to_be_clickable((By.XPATH, "//button[@data-testid='dmComposerSendButton']"))
+    )
+    logger.info("Found send button with data-testid")
+    driver.execute_script("arguments[0].click();", send_button)
+    logger.info("Send button clicked via JavaScript")
+    return True
+
+def send_button_by_aria_label(driver, options, message_input):
+    """Send button by aria-label"""
+    send_button = WebDriverWait(driver, 5).until(
+        EC.element_to_be_clickable((By.XPATH, "//button[@aria-label='Send']"))
+    )
+    logger.info("Found send button with aria-label")
+    driver.execute_script("arguments[0].click();", send_button)
+    logger.info("Send button clicked via JavaScript")
+    return True
+
+def send_button_by_js(driver, options, message_input):
+    """Send button by attributes or its blue icon, found with JavaScript"""
+    send_clicked = driver.execute_script("""
+        // Look for the exact button structure
+        var sendButton = document.querySelector('button[aria-label="Send"][data-testid="dmComposerSendButton"]');
+        
+        // If not found, look for any button with Send in aria-label
+        if (!sendButton) {
+            sendButton = document.querySelector('button[aria-label="Send"]');
+        }
+        
+        // If not found, look for any button with the data-testid
+        if (!sendButton) {
+            sendButton = document.querySelector('button[data-testid="dmComposerSendButton"]');
+        }
+        
+        // If not found, look for a button with a blue SVG icon
+        if (!sendButton) {
+            var buttons = document.querySelectorAll('button');
+            for (var i = 0; i < buttons.length; i++) {
+                if (buttons[i].querySelector('svg[style*="rgb(29, 155, 240)"]')) {
+                    sendButton = buttons[i];
+                    break;
+                }
+            }
+        }
+        
+        // If button found, click it
+        if (sendButton) {
+            sendButton.click();
+            return true;
+        }
+        return false;
+    """)
+    if send_clicked:
+        logger.info("Send button clicked via precise JavaScript targeting")
+    return send_clicked
+
+def send_button_enter_key(driver, options, message_input):
+    """Enter key in the composer, as a last resort"""
+    # Focus the input element again
+    driver.execute_script("arguments[0].focus();", message_input)
+    time.sleep(0.5)
+    
+    # Send Enter key
+    actions = webdriver.ActionChains(driver)
+    actions.send_keys(Keys.RETURN)
+    actions.perform()
+    logger.info("Sent Enter key via ActionChains")
+    time.sleep(1)
     
+    # Try direct send_keys on the element too
     try:
-        # Navigate to user's profile
-        driver.get(f"https://x.com/{username}")
+        message_input.send_keys(Keys.RETURN)
+        logger.info("Sent Enter key directly to input element")
+    except Exception as e:
+        logger.warning(f"Direct Enter key on input failed: {e}")
+    return True
+
+MESSAGE_BUTTON_STRATEGIES = [
+    ('data-testid', message_button_by_testid),
+    ('aria-label', message_button_by_aria_label),
+    ('text-content', message_button_by_text),
+    ('user-actions', message_button_from_user_actions),
+]
+
+COMPOSER_INPUT_STRATEGIES = [
+    ('data-testid', composer_input_by_testid),
+    ('contenteditable', composer_input_by_contenteditable),
+    ('javascript', composer_input_by_js),
+]
+
+SEND_BUTTON_STRATEGIES = [
+    ('data-testid', send_button_by_testid),
+    ('aria-label', send_button_by_aria_label),
+    ('javascript', send_button_by_js),
+    ('enter-key', send_button_enter_key),
+]
+
+# Strategies that act without finding their target (the first user action button, the Enter key).
+# A hit says nothing about the page, so they never become the winner and always stay last
+BLIND_STRATEGIES = {('message_button', 'user-actions'), ('send_button', 'enter-key')}
+
+class LocatorRegistry:
+    """Tracks which locator strategy works for each send_dm step and tries the last winner first"""
+
+    def __init__(self):
+        self.path = None
+        self.stats = {}
+        self.unconfirmed = {}  # step -> strategy whose hit waits for confirm_hit()
+
+    def load(self, path=LOCATOR_STATS_FILE):
+        """Load hit counts and last winners persisted by previous runs"""
+        self.path = path
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.stats = json.load(f)
+                logger.info(f"Loaded locator strategy stats from {path}")
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable {path}: {e}")
+        return self
+
+    def save(self):
+        """Persist hit counts and last winners for the next run"""
+        if self.path:
+            write_json_atomic(self.path, self.stats)
+
+    def _step(self, step):
+        return self.stats.setdefault(step, {"last_winner": None, "strategies": {}})
+
+    def order(self, step, strategies):
+        """Strategies for a step with the last winner moved to the front"""
+        last_winner = self._step(step)["last_winner"]
+        if (step, last_winner) in BLIND_STRATEGIES:  # Saved by runs before blind strategies were excluded
+            last_winner = None
+        return sorted(strategies, key=lambda strategy: strategy[0] != last_winner)
+
+    def record(self, step, name, success):
+        """Count a hit or miss for a strategy"""
+        entry = self._step(step)
+        counts = entry["strategies"].setdefault(name, {"success": 0, "failure": 0})
+        if success:
+            counts["success"] += 1
+            if (step, name) not in BLIND_STRATEGIES:
+                entry["last_winner"] = name
+        else:
+            counts["failure"] += 1
+
+    def last_winner(self, step):
+        """Name of the strategy that worked most recently for a step, or None"""
+        return self.stats.get(step, {}).get("last_winner")
+
+    def run(self, step, strategies, *args, confirm=False):
+        """Try strategies in adaptive order, returning the first truthy result or None.
+        With confirm, a hit only counts once confirm_hit() reports that the click did what it should"""
+        self.unconfirmed.pop(step, None)
+        for name, strategy in self.order(step, strategies):
+            with tracer.span(f"{step}:{name}") as span:
+                try:
+                    result = strategy(*args)
+                except Exception as e:
+                    logger.info("%s strategy '%s' failed: %s", step, name, e.__class__.__name__)
+                    result = None
+                span.outcome = 'hit' if result else 'miss'
+            if result:
+                if confirm:
+                    self.unconfirmed[step] = name
+                else:
+                    self.record(step, name, True)
+                return result
+            self.record(step, name, False)
+        return None
+
+    def confirm_hit(self, step, worked):
+        """Record the pending hit of a run(confirm=True) step as a win or a miss"""
+        name = self.unconfirmed.pop(step, None)
+        if name is not None:
+            self.record(step, name, worked)
+
+    def summary(self):
+        """One line per step and strategy with hit counts, for diagnostics"""
+        lines = []
+        for step, entry in self.stats.items():
+            for name, counts in entry["strategies"].items():
+                total = counts["success"] + counts["failure"]
+                rate = counts["success"] / total if total else 0
+                winner = " (last winner)" if name == entry["last_winner"] else ""
+                lines.append(f"{step} / {name}: {counts['success']} hits, {counts['failure']} misses "
+                             f"({rate:.0%}){winner}")
+        return lines
+
+locator_registry = LocatorRegistry()
+
+class EligibilityCache:
+    """Remembers followers whose DMs were closed, so later runs skip them until the entry expires"""
+
+    def __init__(self, path=ELIGIBILITY_FILE, ttl_days=14, refresh=False, save_every=20):
+        self.path = path
+        self.ttl = timedelta(days=ttl_days)
+        self.enabled = ttl_days > 0
+        self.refresh = refresh  # Check everyone again, entries are only overwritten
+        self.save_every = save_every
+        self.unsaved = 0
+        self.entries = {}  # lowercase username -> {"status": ..., "checked_at": ...}
+        if not self.enabled:
+            return
+        if refresh:
+            logger.info(f"Refreshing DM eligibility, cached results in {path} are checked again")
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+                logger.info(f"Loaded {len(self.entries)} cached DM eligibility results from {path}")
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable {path}: {e}")
+
+    def is_closed(self, username):
+        """True if the user had DMs closed when last checked, within the TTL"""
+        entry = self.entries.get(username.lower())
+        if entry is None or self.refresh:
+            return False
+        return datetime.now() - datetime.fromisoformat(entry["checked_at"]) < self.ttl
+
+    def record(self, username, closed):
+        """Cache that the user doesn't accept DMs, or drop a stale entry once they do"""
+        if not self.enabled:
+            return
+        key = username.lower()
+        if closed:
+            self.entries[key] = {"status": "dms_closed", "checked_at": datetime.now().isoformat()}
+        elif self.entries.pop(key, None) is None:
+            return
+        self.unsaved += 1
+        if self.unsaved >= self.save_every:
+            self.save()
+
+    def save(self):
+        """Write the cache, dropping expired entries"""
+        if not self.enabled or not self.unsaved:
+            return
+        cutoff = (datetime.now() - self.ttl).isoformat()
+        self.entries = {u: e for u, e in self.entries.items() if e["checked_at"] >= cutoff}
+        write_json_atomic(self.path, self.entries)
+        self.unsaved = 0
+
+class ProfileNavigator:
+    """Opens follower profiles inside the loaded app when possible, otherwise with a full page load"""
+
+    def __init__(self, max_misses=3):
+        self.max_misses = max_misses
+        self.misses = 0
+        self.disabled = False
+
+    def navigate(self, driver, username, options, span):
+        """Show @username's profile, setting span.outcome to 'spa' or 'ok' (full load)"""
+        if options['spa_navigation'] and not self.disabled and self.navigate_in_app(driver, username, options):
+            self.misses = 0
+            span.outcome = 'spa'
+            return
+        
+        driver.get(f"{X_BASE_URL}/{username}")
         
         # Wait for profile to load
-        logger.info(f"Waiting for @{username}'s profile to load...")
+        logger.info("Waiting for @%s's profile to load...", username)
         WebDriverWait(driver, 15).until(
             EC.presence_of_element_located((By.XPATH, "//div[@data-testid='primaryColumn']"))
         )
-        
-        # Wait for any loading spinners to disappear
-        time.sleep(3)
-        
-        # Take screenshot of profile before looking for message button (for debugging)
-        if options['take_screenshots']:
-            debug_screenshot = f"profile_{username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            driver.save_screenshot(debug_screenshot)
-            logger.info(f"Profile screenshot saved as {debug_screenshot}")
-        
-        # Try to find and click the message button using multiple methods
-        message_button_found = False
-        
-        # Method 1: Try direct targeting by data-testid
+
+    def navigate_in_app(self, driver, username, options):
+        """Route to the profile without reloading the app, True once it has rendered"""
         try:
-            message_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[@data-testid='sendDMFromProfile']"))
+            if not driver.current_url.startswith(X_BASE_URL) or not driver.execute_script(SPA_NAVIGATE_JS, username):
+                return False
+            WebDriverWait(driver, options['spa_navigation_timeout'], poll_frequency=0.2).until(
+                lambda d: d.execute_script(SPA_PROFILE_READY_JS, username)
             )
-            driver.execute_script("arguments[0].click();", message_button)
-            message_button_found = True
-            logger.info("Found message button with data-testid")
-        except:
-            logger.info("Could not find message button with data-testid")
+            return True
+        except Exception as e:
+            self.misses += 1
+            logger.info("In-app navigation to @%s failed, doing a full page load: %s", username, type(e).__name__)
+            # A page that never routes in place (e.g. a conversation drawer that stays open) would
+            # cost the timeout on every follower, so give up after a few misses in a row
+            if self.misses >= self.max_misses:
+                self.disabled = True
+                logger.warning(f"In-app navigation failed {self.misses} times in a row, "
+                               f"using full page loads for the rest of the run")
+            return False
+
+profile_navigator = ProfileNavigator()
+
+class DMResult(namedtuple('DMResult', ['sent', 'reason'])):
+    """Outcome of send_dm, truthy when the DM went out. reason says why it failed
+    ('dms_closed', 'locator_miss', 'timeout', 'verification_mismatch', 'error'),
+    or is 'unverified' for a send that was clicked but couldn't be confirmed"""
+    __slots__ = ()
+
+    def __bool__(self):
+        return self.sent
+
+# Failures worth another attempt later in the run. Closed DMs won't change by retrying
+RETRYABLE_REASONS = ('locator_miss', 'timeout', 'verification_mismatch', 'error')
+
+# Replacement for your send_dm function with better button handling
+def send_dm(driver, username, message, options):
+    """Send DM to a specific user with verification of success, returns a DMResult"""
+    with tracer.span('send_dm', username=username) as span:
+        result = send_dm_steps(driver, username, message, options)
+        span.outcome = 'sent' if result else result.reason
+    
+    # Take screenshot of failure, closed DMs are an expected outcome
+    if not result and result.reason != 'dms_closed':
+        if options['take_screenshots']:
+            take_screenshot(driver, f"dm_error_{username}", failure=True)
+        take_dom_snapshot(driver, f"dm_error_{username}", failure=True)
+    return result
+
+def send_dm_steps(driver, username, message, options):
+    """The individual send_dm steps, each traced as its own span"""
+    logger.info("Attempting to send DM to @%s...", username)
+    
+    try:
+        with tracer.span('navigate') as span:
+            # Navigate to user's profile
+            profile_navigator.navigate(driver, username, options, span)
+            record_page_stats(driver, span)
         
-        # Method 2: Try finding by aria-label if first method fails
-        if not message_button_found:
+        # Wait for the profile actions to render instead of a fixed pause
+        with tracer.span('profile_ready') as span:
             try:
-                message_button = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[contains(@aria-label, 'Message')]"))
+                WebDriverWait(driver, options['profile_ready_timeout'], poll_frequency=0.2).until(
+                    lambda d: d.execute_script(PROFILE_READY_JS)
                 )
-                driver.execute_script("arguments[0].click();", message_button)
-                message_button_found = True
-                logger.info("Found message button with aria-label")
-            except:
-                logger.info("Could not find message button with aria-label")
+            except TimeoutException:
+                span.outcome = 'timeout'
+                logger.info("Profile actions not ready yet, looking for the message button anyway")
         
-        # Method 3: Use JavaScript to find button by text content
-        if not message_button_found:
-            try:
-                message_clicked = driver.execute_script("""
-                    var buttons = document.querySelectorAll('button, div[role="button"]');
-                    for (var i = 0; i < buttons.length; i++) {
-                        if (buttons[i].textContent.toLowerCase().includes('message')) {
-                            buttons[i].click();
-                            return true;
-                        }
-                    }
-                    return false;
-                """)
-                
-                if message_clicked:
-                    message_button_found = True
-                    logger.info("Found and clicked message button with JavaScript")
-                else:
-                    logger.info("JavaScript could not find a message button")
-            except Exception as e:
-                logger.info(f"JavaScript approach error: {e}")
+        # Take screenshot of profile before looking for message button (for debugging)
+        if options['take_screenshots']:
+            take_screenshot(driver, f"profile_{username}")
+        take_dom_snapshot(driver, f"profile_{username}")
         
-        # If we still can't find the message button, try the user actions area
-        if not message_button_found:
-            try:
-                # Click the first button in the user actions area
-                driver.execute_script("""
-                    var userActions = document.querySelector('div[data-testid="userActions"]');
-                    if (userActions) {
-                        var buttons = userActions.querySelectorAll('div[role="button"]');
-                        if (buttons.length > 0) {
-                            buttons[0].click();
-                            return true;
-                        }
-                    }
-                    return false;
-                """)
-                logger.info("Clicked first button in user actions area")
-                message_button_found = True
-            except:
-                logger.warning("Failed to click any button in user actions area")
+        # Once the data-testid locator is known to work, a rendered profile without that
+        # button means DMs are closed, no need to wait through every other strategy
+        if locator_registry.last_winner('message_button') == 'data-testid' and dms_closed(driver, options):
+            logger.warning("@%s doesn't accept DMs (no Message button on the profile)", username)
+            return DMResult(False, 'dms_closed')
+        
+        # Try to find and click the message button, last working strategy first. The click
+        # only counts as a win once the composer opens, fallbacks can hit some other button
+        with tracer.span('locate_button') as span:
+            message_button_found = locator_registry.run(
+                'message_button', MESSAGE_BUTTON_STRATEGIES, driver, options, confirm=True
+            ) is not None
+            span.outcome = 'ok' if message_button_found else 'miss'
         
         if not message_button_found:
-            logger.error(f"Could not find or click message button for @{username}")
-            return False
+            if driver.execute_script(DMS_CLOSED_JS):
+                logger.warning("@%s doesn't accept DMs (no Message button on the profile)", username)
+                return DMResult(False, 'dms_closed')
+            logger.error("Could not find or click message button for @%s", username)
+            return DMResult(False, 'locator_miss')
         
         # Wait for DM modal to appear
         logger.info("Waiting for DM composer...")
-        time.sleep(3)
         
-        # Try different methods to find the message input
-        message_input = None
-
-        # Method 1: Look for the input by data-testid
-        try:
-            message_input = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, "//div[@data-testid='dmComposerTextInput']"))
-            )
-            logger.info("Found message input with data-testid")
-        except:
-            logger.info("Could not find message input with data-testid")
-
-        # Method 2: Look for contenteditable div
-        if not message_input:
-            try:
-                message_input = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, "//div[@role='textbox' and @contenteditable='true']"))
-                )
-                logger.info("Found message input with contenteditable attribute")
-            except:
-                logger.info("Could not find contenteditable message input")
-
-        # Method 3: Use JavaScript to find any contenteditable element
-        if not message_input:
-            try:
-                message_input = driver.execute_script("""
-                    return document.querySelector('div[contenteditable="true"]');
-                """)
-                if message_input:
-                    logger.info("Found message input with JavaScript")
-                else:
-                    logger.warning("JavaScript could not find message input")
-            except Exception as e:
-                logger.info(f"JavaScript input search error: {e}")
+        # Try different methods to find the message input, last working strategy first
+        with tracer.span('open_composer') as span:
+            message_input = locator_registry.run('composer_input', COMPOSER_INPUT_STRATEGIES, driver, options)
+            span.outcome = 'ok' if message_input else 'miss'
+        locator_registry.confirm_hit('message_button', bool(message_input))
         if not message_input:
-            logger.error(f"Could not find message input for @{username}")
-            return False
+            # A fallback strategy may have clicked some other profile button
+            if driver.execute_script(DMS_CLOSED_JS):
+                logger.warning("@%s doesn't accept DMs (no Message button on the profile)", username)
+                return DMResult(False, 'dms_closed')
+            logger.error("Could not find message input for @%s", username)
+            return DMResult(False, 'locator_miss')
 
         # Store original message content for verification
         message_first_words = message.split()[:3]
         message_snippet = ' '.join(message_first_words)
-        logger.info(f"Will verify message containing: '{message_snippet}'")
+        logger.info("Will verify message containing: '%s'", message_snippet)
 
-        # Type the message with line breaks
-        try:
-            # Focus the input first
-            driver.execute_script("arguments[0].focus();", message_input)
-            time.sleep(0.5)
-            
-            # Try to clear any existing text and placeholder
-            driver.execute_script("""
-                var element = arguments[0];
-                element.innerHTML = '';
-                element.textContent = '';
-            """, message_input)
-            time.sleep(0.5)
-            
-            # Click on the input to ensure it's activated
-            message_input.click()
-            time.sleep(0.5)
-            
-            # Type the message line by line to handle line breaks
-            for line in message.split('\n'):
-                message_input.send_keys(line)
-                message_input.send_keys(Keys.SHIFT, Keys.RETURN)
-                time.sleep(0.2)  # Small delay between lines
-            
-            logger.info("Message typed with line breaks")
-            
-            # Additional check to verify text was entered
-            entered_text = driver.execute_script("return arguments[0].textContent || arguments[0].innerText;", message_input)
-            logger.info(f"Verified text in input field: '{entered_text[:20]}...'")
-            
-            # If verification fails, try another approach
-            if not entered_text or entered_text.strip() == '':
-                logger.warning("Text verification failed, trying alternate approach")
-                # Try using ActionChains for typing
-                actions = webdriver.ActionChains(driver)
-                message_input.click()
-                for line in message.split('\n'):
-                    actions.send_keys(line)
-                    actions.key_down(Keys.SHIFT).send_keys(Keys.RETURN).key_up(Keys.SHIFT)
-                actions.perform()
-                logger.info("Message typed using ActionChains with line breaks")
-                
-                # Check again after ActionChains
-                entered_text = driver.execute_script("return arguments[0].textContent || arguments[0].innerText;", message_input)
-                logger.info(f"After ActionChains, text in field: '{entered_text[:20]}...'")
-        except Exception as e:
-            logger.warning(f"Advanced typing methods failed: {e}, trying fallback method")
-            try:
-                # Traditional SendKeys approach
-                message_input.click()
-                message_input.clear()
-                for line in message.split('\n'):
-                    message_input.send_keys(line)
-                    message_input.send_keys(Keys.SHIFT, Keys.RETURN)
-                logger.info("Message typed using basic send_keys with line breaks")
-            except Exception as e2:
-                logger.error(f"All typing methods failed: {e2}")
-                return False
+        # Insert the message in one step, typing it line by line if that doesn't take
+        with tracer.span('type', chars=len(message)) as span:
+            span.attrs['method'] = 'insert'
+            if options['message_entry'] != 'insert' or not insert_message(driver, message_input, message):
+                span.attrs['method'] = 'keys'
+                if not type_message(driver, message_input, message):
+                    span.outcome = 'fail'
+                    return DMResult(False, 'error')
 
         # Take screenshot after typing
         if options['take_screenshots']:
-            after_type_screenshot = f"after_type_{username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            driver.save_screenshot(after_type_screenshot)
-            logger.info(f"After typing screenshot saved as {after_type_screenshot}")
-        
-        # Wait a moment after typing
-        time.sleep(2)
-        
-        # IMPROVED SEND BUTTON TARGETING based on your HTML snippet
-        send_button_clicked = False
+            take_screenshot(driver, f"after_type_{username}")
+        take_dom_snapshot(driver, f"after_type_{username}")
         
-        # Method 1: Direct target the send button using the data-testid from your HTML
-        try:
-            send_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[@data-testid='dmComposerSendButton']"))
-            )
-            logger.info("Found send button with data-testid")
-            
-            # Try JavaScript click first
-            driver.execute_script("arguments[0].click();", send_button)
-            logger.info("Send button clicked via JavaScript")
-            send_button_clicked = True
-        except Exception as e:
-            logger.info(f"Could not find or click send button with data-testid: {e}")
-        
-        # Method 2: Try using the exact HTML structure you provided
-        if not send_button_clicked:
+        with tracer.span('send') as span:
+            # Wait for the composer to enable the send button after typing
             try:
-                # Target button with aria-label="Send"
-                send_button = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[@aria-label='Send']"))
+                WebDriverWait(driver, options['send_ready_timeout'], poll_frequency=0.1).until(
+                    lambda d: d.execute_script(SEND_READY_JS)
                 )
-                logger.info("Found send button with aria-label")
-                
-                # Try JavaScript click
-                driver.execute_script("arguments[0].click();", send_button)
-                logger.info("Send button clicked via JavaScript")
-                send_button_clicked = True
-            except Exception as e:
-                logger.info(f"Could not find or click send button with aria-label: {e}")
-        
-        # Method 3: Use more precise JavaScript targeting based on the HTML you provided
-        if not send_button_clicked:
-            try:
-                send_clicked = driver.execute_script("""
-                    // Look for the exact button structure you shared
-                    var sendButton = document.querySelector('button[aria-label="Send"][data-testid="dmComposerSendButton"]');
-                    
-                    // If not found, look for any button with Send in aria-label
-                    if (!sendButton) {
-                        sendButton = document.querySelector('button[aria-label="Send"]');
-                    }
-                    
-                    // If not found, look for any button with the data-testid
-                    if (!sendButton) {
-                        sendButton = document.querySelector('button[data-testid="dmComposerSendButton"]');
-                    }
-                    
-                    // If not found, look for a button with a blue SVG icon
-                    if (!sendButton) {
-                        var buttons = document.querySelectorAll('button');
-                        for (var i = 0; i < buttons.length; i++) {
-                            if (buttons[i].querySelector('svg[style*="rgb(29, 155, 240)"]')) {
-                                sendButton = buttons[i];
-                                break;
-                            }
-                        }
-                    }
-                    
-                    // If button found, click it
-                    if (sendButton) {
-                        sendButton.click();
-                        return true;
-                    }
-                    return false;
-                """)
-                
-                if send_clicked:
-                    logger.info("Send button clicked via precise JavaScript targeting")
-                    send_button_clicked = True
-                else:
-                    logger.warning("JavaScript could not find and click send button")
-            except Exception as e:
-                logger.info(f"JavaScript send button click error: {e}")
-        
-        # Method 4: Hit Enter key as last resort
-        if not send_button_clicked:
-            try:
-                # Focus the input element again
-                driver.execute_script("arguments[0].focus();", message_input)
-                time.sleep(0.5)
-                
-                # Send Enter key
-                actions = webdriver.ActionChains(driver)
-                actions.send_keys(Keys.RETURN)
-                actions.perform()
-                logger.info("Sent Enter key via ActionChains")
-                send_button_clicked = True
-                time.sleep(1)
-                
-                # Try direct send_keys on the element too
-                message_input.send_keys(Keys.RETURN)
-                logger.info("Sent Enter key directly to input element")
-            except Exception as e:
-                logger.warning(f"Enter key approach failed: {e}")
+            except TimeoutException:
+                logger.info("Send button not enabled yet, trying to send anyway")
+            
+            # Click send, last working strategy first. It counts as a win once the send is verified
+            send_button_clicked = locator_registry.run(
+                'send_button', SEND_BUTTON_STRATEGIES, driver, options, message_input, confirm=True
+            ) is not None
+            span.outcome = 'ok' if send_button_clicked else 'miss'
         
         # Take screenshot after sending attempt
         if options['take_screenshots']:
-            after_send_screenshot = f"after_send_{username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            driver.save_screenshot(after_send_screenshot)
-            logger.info(f"After send screenshot saved as {after_send_screenshot}")
+            take_screenshot(driver, f"after_send_{username}")
         
-        # Wait longer for the send operation to complete
-        time.sleep(5)
-        
-        # Check for message sent confirmation
+        # Wait for the send to land in the conversation: our text shows up in the
+        # conversation container, or the composer is cleared
         message_sent = False
-        
-        # Method 1: Look for our message in the conversation
-        try:
-            message_xpath = f"//div[contains(text(), '{message_snippet}')]"
-            message_found = driver.find_elements(By.XPATH, message_xpath)
-            if message_found:
-                logger.info(f"Found our message in conversation: '{message_snippet}'")
-                message_sent = True
-            else:
-                logger.info("Didn't find our message in conversation")
-        except Exception as e:
-            logger.warning(f"Error checking for message in conversation: {e}")
-        
-        # Method 2: Check if input field is now empty (indicating message sent)
-        if not message_sent:
+        still_in_composer = False
+        verification = None
+        with tracer.span('verify') as span:
             try:
-                input_html = message_input.get_attribute('innerHTML')
-                if not input_html or input_html.strip() == '<br>' or input_html.strip() == '':
-                    logger.info("Message input is now empty, likely indicating message was sent")
-                    message_sent = True
-                else:
-                    logger.info("Message input still has content")
+                verification = WebDriverWait(driver, options['verify_timeout'], poll_frequency=0.25).until(
+                    lambda d: d.execute_script(VERIFY_SENT_JS, message_snippet)
+                )
+            except TimeoutException:
+                logger.info("Didn't see the message land within the verification timeout")
             except Exception as e:
-                logger.warning(f"Error checking input content: {e}")
-        
-        # Method 3: Check URL change (in messages section)
-        if not message_sent and 'messages' in driver.current_url:
-            logger.info("URL contains 'messages', considering this a success")
-            message_sent = True
+                logger.warning(f"Error checking for message in conversation: {e}")
+            
+            # Method 1: Our message is in the conversation
+            if verification == 'found':
+                logger.info("Found our message in conversation: '%s'", message_snippet)
+                message_sent = True
+            
+            # Method 2: Input field is now empty (indicating message sent)
+            elif verification == 'empty':
+                logger.info("Message input is now empty, likely indicating message was sent")
+                message_sent = True
+            
+            # Method 3: Check URL change (in messages section). Opening the conversation already
+            # lands on /messages, so this only counts once our text has left the composer
+            if not message_sent:
+                still_in_composer = driver.execute_script(STILL_IN_COMPOSER_JS, message_snippet)
+                if not still_in_composer and 'messages' in driver.current_url:
+                    logger.info("URL contains 'messages' and the composer is clear, considering this a success")
+                    message_sent = True
+            span.outcome = verification or ('url' if message_sent else
+                                            'still_in_composer' if still_in_composer else 'unverified')
+        locator_registry.confirm_hit('send_button', message_sent)
         
         # Final verdict
         if message_sent:
-            logger.info(f"✅ DM CONFIRMED SENT: Successfully sent DM to @{username}")
-            return True
+            logger.info("✅ DM CONFIRMED SENT: Successfully sent DM to @%s", username)
+            return DMResult(True, None)
         elif send_button_clicked:
-            logger.warning(f"⚠️ DM UNCERTAIN: Button clicked but couldn't verify message was sent to @{username}")
-            # Return true anyway since we at least clicked the button
-            return True
+            if still_in_composer:
+                logger.error("⚠️ DM FAILED: Send was clicked but the message is still in the composer for @%s", username)
+                return DMResult(False, 'verification_mismatch')
+            logger.warning("⚠️ DM UNCERTAIN: Button clicked but couldn't verify message was sent to @%s", username)
+            # Count it as sent since we at least clicked the button, retrying could send it twice
+            return DMResult(True, 'unverified')
         else:
-            logger.error(f"⚠️ DM FAILED: Could not find or click send button for @{username}")
-            return False
-            
+            logger.error("⚠️ DM FAILED: Could not find or click send button for @%s", username)
+            return DMResult(False, 'locator_miss')
+    
+    except TimeoutException as e:
+        logger.error("⚠️ DM FAILED: Timed out sending DM to @%s: %s", username, e)
+        return DMResult(False, 'timeout')
     except Exception as e:
-        logger.error(f"⚠️ DM FAILED: Error sending DM to @{username}: {e}")
-        # Take screenshot of failure
-        if options['take_screenshots']:
-            try:
-                screenshot_file = f"dm_error_{username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                driver.save_screenshot(screenshot_file)
-                logger.info(f"Screenshot saved as {screenshot_file}")
-            except:
-                logger.error("Failed to save screenshot")
+        logger.error("⚠️ DM FAILED: Error sending DM to @%s: %s", username, e)
+        return DMResult(False, 'error')
+
+def insert_message(driver, message_input, message):
+    """Put the whole message into the composer with one script call, True once a read-back matches it"""
+    expected = ' '.join(message.split())
+    try:
+        method = driver.execute_script(INSERT_MESSAGE_JS, message_input, message)
+        # Checks right away, polls briefly only if the editor renders the paste asynchronously
+        WebDriverWait(driver, 1, poll_frequency=0.1).until(
+            lambda d: ' '.join(d.execute_script(READ_MESSAGE_JS, message_input).split()) == expected
+        )
+    except TimeoutException:
+        logger.info("Inserted text doesn't match the message, typing it instead")
+        return False
+    except Exception as e:
+        logger.info("Single-step insert failed (%s), typing the message instead", e.__class__.__name__)
         return False
+    logger.info("Message inserted in one step (%s)", method)
+    return True
+
+def type_message(driver, message_input, message):
+    """Type the message into the composer with line breaks, returns False if every method failed"""
+    try:
+        # Focus the input first
+        driver.execute_script("arguments[0].focus();", message_input)
+        time.sleep(0.5)
+        
+        # Try to clear any existing text and placeholder
+        driver.execute_script("""
+            var element = arguments[0];
+            element.innerHTML = '';
+            element.textContent = '';
+        """, message_input)
+        time.sleep(0.5)
+        
+        # Click on the input to ensure it's activated
+        message_input.click()
+        time.sleep(0.5)
+        
+        # Type the message line by line to handle line breaks
+        for line in message.split('\n'):
+            message_input.send_keys(line)
+            message_input.send_keys(Keys.SHIFT, Keys.RETURN)
+            time.sleep(0.2)  # Small delay between lines
+        
+        logger.info("Message typed with line breaks")
+        
+        # Additional check to verify text was entered
+        entered_text = driver.execute_script("return arguments[0].textContent || arguments[0].innerText;", message_input)
+        logger.info("Verified text in input field: '%s...'", entered_text[:20])
+        
+        # If verification fails, try another approach
+        if not entered_text or entered_text.strip() == '':
+            logger.warning("Text verification failed, trying alternate approach")
+            # Try using ActionChains for typing
+            actions = webdriver.ActionChains(driver)
+            message_input.click()
+            for line in message.split('\n'):
+                actions.send_keys(line)
+                actions.key_down(Keys.SHIFT).send_keys(Keys.RETURN).key_up(Keys.SHIFT)
+            actions.perform()
+            logger.info("Message typed using ActionChains with line breaks")
+            
+            # Check again after ActionChains
+            entered_text = driver.execute_script("return arguments[0].textContent || arguments[0].innerText;", message_input)
+            logger.info("After ActionChains, text in field: '%s...'", entered_text[:20])
+        return True
+    except Exception as e:
+        logger.warning("Advanced typing methods failed: %s, trying fallback method", e)
+        try:
+            # Traditional SendKeys approach
+            message_input.click()
+            message_input.clear()
+            for line in message.split('\n'):
+                message_input.send_keys(line)
+                message_input.send_keys(Keys.SHIFT, Keys.RETURN)
+            logger.info("Message typed using basic send_keys with line breaks")
+            return True
+        except Exception as e2:
+            logger.error("All typing methods failed: %s", e2)
+            return False
+
+def select_followers_to_message(followers, store, options, eligibility=None, stats=None, dedupe=True):
+    """Yield the followers to message: already messaged, duplicate and known DMs-closed
+    followers are dropped, then skip_first_n and max_followers_to_process applied.
+
+    followers can be any iterable and is consumed lazily as the caller asks for the
+    next follower: only the skipped followers and the usernames seen so far are held,
+    never the whole input. Pass a dict as stats to get the read/closed/skip counts.
+    """
+    stats = {} if stats is None else stats
+    stats.update(read=0, closed=0, skipped=0, limited=False)
+    
+    def counted(usernames):
+        for username in usernames:
+            stats['read'] += 1
+            yield username
+    
+    # Filter out already messaged followers, then duplicates
+    unmessaged = store.iter_unmessaged(counted(followers))
+    if dedupe:
+        unmessaged = dedupe_followers(unmessaged)
+    if eligibility is not None and eligibility.entries:
+        def reachable(usernames):
+            for username in usernames:
+                if eligibility.is_closed(username):
+                    stats['closed'] += 1
+                else:
+                    yield username
+        unmessaged = reachable(unmessaged)
+    
+    skip = options['skip_first_n']
+    limit = options['max_followers_to_process']
+    limit = None if limit == float('inf') else int(limit)
+    skipped = list(islice(unmessaged, skip))
+    first = next(unmessaged, None)
+    
+    # Apply skip option (useful for resuming). Skipping everything messages the skipped ones instead
+    if first is None:
+        if skip > 0:
+            stats['skipped'] = -len(skipped)
+            yield from skipped[:limit]
+        return
+    stats['skipped'] = len(skipped)
+    del skipped
+    
+    # Apply maximum followers limit
+    for position, username in enumerate(chain([first], unmessaged), 1):
+        if limit is not None and position > limit:
+            stats['limited'] = True
+            return
+        yield username
+
+def count_followers_to_message(followers, store, options, eligibility=None):
+    """Number of followers select_followers_to_message() will yield, counted in a streaming pass
+    that keeps nothing. Case-insensitive duplicates are counted too (dropping them would need
+    every username in memory), so with duplicates in the list this is an upper bound."""
+    stats = {}
+    count = sum(1 for _ in select_followers_to_message(followers, store, options, eligibility, stats, dedupe=False))
+    
+    skip = options['skip_first_n']
+    if stats['skipped'] < 0:
+        logger.warning(f"Skip count {skip} is >= followers count {-stats['skipped']}")
+    elif skip > 0 and count:
+        logger.info(f"Skipping first {skip} followers as requested")
+    if stats['limited']:
+        logger.info(f"Limiting to first {options['max_followers_to_process']} followers as configured")
+    if stats['closed']:
+        logger.info(f"Skipping {stats['closed']} followers cached as not accepting DMs")
+    logger.info(f"Need to message {count} followers ({stats['read']} read from the followers list)")
+    return count
+
+def traced_send_timings(max_files=5):
+    """Mean send_dm duration, failure rate and sample size from the most recent trace files"""
+    durations = []
+    failures = 0
+    for path in sorted(glob.glob("x_dm_trace_*.jsonl"))[-max_files:]:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry["span"] == 'send_dm':
+                    durations.append(entry["duration"])
+                    failures += entry["outcome"] != 'sent'
+    if not durations:
+        return None, None, 0
+    return sum(durations) / len(durations), failures / len(durations), len(durations)
+
+def format_duration(seconds):
+    """Seconds as h:mm:ss"""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def plan_campaign(config, options):
+    """Print how many followers are left and an estimated run time, without a browser"""
+    use_followers_txt = config.get('options', {}).get('useFollowerstxt', False)
+    source = FOLLOWERS_FILE if use_followers_txt else FOLLOWERS_LIST_FILE
+    source_note = ""
+    if not use_followers_txt and load_followers_checkpoint(config['x_credentials']['account_name']):
+        source_note = " (collection incomplete, the next run resumes it)"
+    
+    follower_count = sum(1 for _ in iter_followers_from_file(source)) if os.path.exists(source) else 0
+    followers = iter_followers_from_file(source) if os.path.exists(source) else []
+    store = open_progress_store(options, read_only=True)
+    try:
+        eligibility = EligibilityCache(ttl_days=options['eligibility_ttl_days'])
+        count = count_followers_to_message(followers, store, options, eligibility)
+        messaged_count = store.count_messaged()
+        failed_count = store.count_failed()
+    finally:
+        store.close()
+    
+    send_seconds, failure_rate, samples = traced_send_timings()
+    if samples:
+        timing_note = f"mean of {samples} traced DMs"
+    else:
+        send_seconds, failure_rate = DEFAULT_SEND_SECONDS, 0
+        timing_note = "default, no traces yet"
+    
+    per_follower = send_seconds + options['dm_interval']
+    total = max(0, count * per_follower - options['dm_interval'])
+    if options['retry_failed']:
+        # Failures are retried after the main pass, each retry costs another attempt and interval
+        total += count * failure_rate * options['max_retries'] * per_follower
+    
+    print(f"Followers source:      {source}, {follower_count} followers{source_note}")
+    print(f"Already messaged:      {messaged_count}")
+    print(f"Previously failed:     {failed_count}")
+    print(f"To message this run:   {count} (skip_first_n={options['skip_first_n']}, "
+          f"max_followers_to_process={options['max_followers_to_process']})")
+    print(f"Time per follower:     {send_seconds:.1f}s sending ({timing_note}) + {options['dm_interval']}s interval, "
+          f"{failure_rate:.0%} failures")
+    print(f"Estimated wall time:   {format_duration(total)}")
 
-def main():
+def show_history(options, username=None):
+    """Print one user's attempts, or the stats of every run, from the SQLite progress store"""
+    path = options['progress_db']
+    if not os.path.exists(path):
+        print(f"No SQLite progress store at {path}, attempt history and run stats are kept with progress_store: sqlite")
+        return
+    store = SqliteProgressStore(path, read_only=True)
+    try:
+        if username is not None:
+            username = username.lstrip('@')
+            history = store.attempt_history(username)
+            status = "messaged" if store.is_messaged(username) else "not messaged"
+            print(f"@{username}: {status}, {len(history)} attempts")
+            for at, success, reason in history:
+                print(f"  {at[:19]}  {'sent' if success else 'failed'}{f' ({reason})' if reason else ''}")
+        else:
+            print(f"{'run':>5}  {'started':<21}{'finished':<21}{'sent':>8}{'failed':>8}")
+            for run_id, started_at, finished_at, success, failed in store.run_stats():
+                print(f"{run_id:>5}  {started_at[:19]:<21}{(finished_at or 'unfinished')[:19]:<21}"
+                      f"{success:>8}{failed:>8}")
+    finally:
+        store.close()
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Send DMs to the followers of an X account")
+    parser.add_argument("--import-json", action="store_true",
+                        help=f"Import {PROGRESS_FILE} and {FAIL_FILE} into the SQLite progress store and exit")
+    parser.add_argument("--export-json", action="store_true",
+                        help=f"Export the SQLite progress store to {PROGRESS_FILE} and {FAIL_FILE} and exit")
+    parser.add_argument("--history", metavar="USER",
+                        help="Show every DM attempt on USER from the SQLite progress store and exit")
+    parser.add_argument("--runs", action="store_true",
+                        help="Show sent and failed counts per run from the SQLite progress store and exit")
+    parser.add_argument("--plan", action="store_true",
+                        help="Show how many followers are left to message and the estimated run time, without a browser")
+    parser.add_argument("--refresh-eligibility", action="store_true",
+                        help=f"Ignore {ELIGIBILITY_FILE} and check again whether cached followers accept DMs")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Profile CPU (cProfile) and memory (tracemalloc) into {PROFILE_DIR}/")
+    parser.add_argument("--profile-every", type=int, default=100, metavar="N",
+                        help="With --profile, take an allocation snapshot every N followers (default 100)")
+    parser.add_argument("--trace-summary", metavar="TRACE_FILE",
+                        help="Print p50/p95/p99 per step for a x_dm_trace_*.jsonl file and exit")
+    return parser.parse_args(argv)
+
+def main(args=None):
+    if args is None:
+        args = parse_args([])
+    
+    if args.trace_summary:
+        summarize_trace(args.trace_summary)
+        return
+    
     # Load configuration
     config = load_config()
     username = config['x_credentials']['username']
@@ -800,91 +2698,155 @@ def main():
     
     # Get advanced options
     options = get_advanced_options(config)
+    configure_logging(options)
     
-    # Load progress
-    progress, failed = load_progress()
-    messaged_usernames = set(progress.get("messaged_usernames", []))
+    if args.plan:
+        plan_campaign(config, options)
+        return
+    
+    if args.history or args.runs:
+        show_history(options, args.history)
+        return
+    
+    # One-off conversions between the JSON files and the SQLite store
+    if args.import_json or args.export_json:
+        store = SqliteProgressStore(options['progress_db'], auto_import=False, start_run=False)
+        try:
+            if args.import_json:
+                store.import_json()
+            if args.export_json:
+                store.export_json()
+        finally:
+            store.close()
+        return
+    
+    if options['trace_steps']:
+        tracer.start(TRACE_FILE)
+    screenshot_writer.configure(options)
+    dom_snapshot_writer.configure(options)
     
-    # Initialize stats if not present
-    if "stats" not in progress:
-        progress["stats"] = {"success": 0, "failed": 0}
+    # Load progress
+    store = open_progress_store(options)
+    locator_registry.load(LOCATOR_STATS_FILE)
+    if options['metrics_port']:
+        metrics.start(options['metrics_port'])
+        tracer.listeners.append(
+            lambda span, duration: metrics.observe('x_dm_step_duration_seconds', duration, step=span.name)
+        )
+        metrics.set('x_dm_messaged_users', store.count_messaged())
+    eligibility = EligibilityCache(ttl_days=options['eligibility_ttl_days'], refresh=args.refresh_eligibility)
     
     # Setup driver
+    startup_started = time.perf_counter()
     try:
-        driver = setup_driver(headless=headless)
+        driver = setup_driver(headless=headless, profile_dir=options['chrome_profile_dir'],
+                              block_resources=options['block_resources'])
     except Exception as e:
         logger.error(f"Failed to initialize driver: {e}")
         logger.error("Please ensure Chrome is properly installed and updated")
+        store.close()
+        tracer.close()
+        screenshot_writer.close()
+        dom_snapshot_writer.close()
+        metrics.close()
         return
     
     try:
-        # Login to X
-        if not login_to_x(driver, username, password, options):
+        # Login to X, or reuse the persistent profile's session
+        if not ensure_logged_in(driver, username, password, options):
             logger.error("Failed to login. Exiting...")
             driver.quit()
             return
+        logger.info(f"Startup took {time.perf_counter() - startup_started:.1f}s (browser launch and login)")
         
         # Determine how to get followers
         use_followers_txt = config.get('options', {}).get('useFollowerstxt', False)
         if use_followers_txt:
-            followers = load_followers_from_file()
+            # Counted in one streaming pass, then read again lazily as the loop goes
+            total = count_followers_to_message(iter_followers_from_file(), store, options, eligibility)
+            followers_to_message = select_followers_to_message(iter_followers_from_file(), store, options, eligibility)
         else:
-            followers = get_followers(driver, account_name, options)
-        
-        # Filter out already messaged followers
-        followers_to_message = [f for f in followers if f not in messaged_usernames]
-        logger.info(f"Need to message {len(followers_to_message)} out of {len(followers)} followers")
-        
-        # Apply skip option (useful for resuming)
-        if options['skip_first_n'] > 0:
-            if options['skip_first_n'] < len(followers_to_message):
-                logger.info(f"Skipping first {options['skip_first_n']} followers as requested")
-                followers_to_message = followers_to_message[options['skip_first_n']:]
-            else:
-                logger.warning(f"Skip count {options['skip_first_n']} is >= followers count {len(followers_to_message)}")
+            with tracer.span('get_followers') as span:
+                followers = get_followers(driver, account_name, options)
+                span.attrs['count'] = len(followers)
+            total = count_followers_to_message(followers, store, options, eligibility)
+            followers_to_message = select_followers_to_message(followers, store, options, eligibility)
         
-        # Apply maximum followers limit
-        if len(followers_to_message) > options['max_followers_to_process']:
-            logger.info(f"Limiting to first {options['max_followers_to_process']} followers as configured")
-            followers_to_message = followers_to_message[:options['max_followers_to_process']]
+        watchdog = BrowserWatchdog(options)
+        if watchdog.enabled and not options['chrome_profile_dir']:
+            logger.info("Browser recycling is on without chrome_profile_dir, each restart logs in again")
         
-        # Send DMs to followers
+        # Send DMs to followers, pulled from the selection one at a time. Retryable failures
+        # go to a queue that is worked through after the main pass instead of straight away. Log calls in this loop
+        # and in send_dm use %-style arguments so records are only formatted when written
         success_count = 0
         fail_count = 0
+        retry_queue = deque()
+        retries = {}  # username -> retries queued so far
+        processed = 0
+        taken = 0  # Followers pulled from the selection so far
+        loop_started = clock.monotonic()
         
-        for i, follower in enumerate(followers_to_message):
-            logger.info(f"Processing follower {i+1}/{len(followers_to_message)}: @{follower}")
+        while True:
+            remaining = max(0, total - taken) + len(retry_queue)
+            if processed:
+                # Average time per follower so far, interval included
+                metrics.set('x_dm_eta_seconds', (clock.monotonic() - loop_started) / processed * remaining)
+            metrics.set('x_dm_queue_remaining', remaining)
+            follower = next(followers_to_message, None)
+            if follower is not None:
+                taken += 1
+            elif retry_queue:
+                follower = retry_queue.popleft()
+            else:
+                break
+            if processed:
+                run_profiler.follower_done(processed)
+                
+                # Restart a bloated or stuck browser between followers, never in the middle of a send
+                recycle_reason = watchdog.check(driver)
+                if recycle_reason:
+                    driver = recycle_driver(driver, headless, username, password, options, recycle_reason)
+                    if driver is None:
+                        break
+                    watchdog.reset()
+                
+                # Sleep to avoid rate limiting
+                logger.info("Waiting %s seconds before next DM...", options['dm_interval'])
+                clock.sleep(options['dm_interval'])
+            processed += 1
+            
+            if follower in retries:
+                logger.info("Retrying @%s (retry %d/%d)", follower, retries[follower], options['max_retries'])
+            else:
+                logger.info("Processing follower %d/%d: @%s", taken, total, follower)
+            
+            result = send_dm(driver, follower, message, options)
             
-            # Send DM and handle retry if needed
-            dm_sent = send_dm(driver, follower, message, options)
+            if (not result and options['retry_failed'] and result.reason in RETRYABLE_REASONS
+                    and retries.get(follower, 0) < options['max_retries']):
+                retries[follower] = retries.get(follower, 0) + 1
+                retry_queue.append(follower)
+                metrics.inc('x_dm_retries_total')
+                logger.info("Queued @%s for a retry after the main pass (%s)", follower, result.reason)
+                continue
             
-            if not dm_sent and options['retry_failed']:
-                logger.info(f"Retrying DM to @{follower} after waiting...")
-                time.sleep(10)  # Wait before retry
-                dm_sent = send_dm(driver, follower, message, options)
+            # Record the final outcome in the progress store
+            with tracer.span('save_progress'):
+                store.record(follower, result.sent, result.reason)
+            eligibility.record(follower, result.reason == 'dms_closed')
             
-            if dm_sent:
-                # Update progress for successful DM
-                messaged_usernames.add(follower)
-                progress["messaged_usernames"] = list(messaged_usernames)
-                progress["stats"]["success"] += 1
+            if result:
                 success_count += 1
-                logger.info(f"Progress: {success_count}/{len(followers_to_message)} complete")
+                metrics.inc('x_dm_dms_sent_total')
+                metrics.inc('x_dm_messaged_users')
+                logger.info("Progress: %d/%d complete", success_count, total)
             else:
-                # Track failed attempts
-                progress["stats"]["failed"] += 1
                 fail_count += 1
-                failed.append(follower)
-                logger.warning(f"Failed to send DM to @{follower}")
-            
-            # Save progress after each attempt
-            save_progress(progress, failed)
-            
-            # Sleep to avoid rate limiting
-            if i < len(followers_to_message) - 1:  # Don't wait after the last message
-                logger.info(f"Waiting {options['dm_interval']} seconds before next DM...")
-                time.sleep(options['dm_interval'])
+                metrics.inc('x_dm_dms_failed_total', reason=result.reason)
+                logger.warning("Failed to send DM to @%s (%s)", follower, result.reason)
         
+        metrics.set('x_dm_queue_remaining', len(retry_queue))
         logger.info(f"✅ PROCESS COMPLETED: Successfully sent {success_count} DMs, Failed: {fail_count}")
     
     except KeyboardInterrupt:
@@ -893,19 +2855,39 @@ def main():
         logger.error(f"An error occurred: {e}")
     
     finally:
+        # Flush and close the progress store
+        store.close()
+        
+        # Keep locator hit rates and DM eligibility for the next run
+        locator_registry.save()
+        eligibility.save()
+        for line in locator_registry.summary():
+            logger.info(f"Locator stats: {line}")
+        tracer.close()
+        screenshot_writer.close()
+        dom_snapshot_writer.close()
+        metrics.close()
+        
         # Always close the driver
         logger.info("Closing browser...")
-        driver.quit()
+        if driver is not None:
+            driver.quit()
         logger.info("Browser closed. Script terminated.")
 
 if __name__ == "__main__":
+    args = parse_args()
+    
     # Set up logging first
     logger = setup_logging()
     logger.info("============ X DM SCRIPT STARTED ============")
     
     try:
-        main()
+        if args.profile:
+            run_profiler.run(main, args, snapshot_every=args.profile_every)
+        else:
+            main(args)
     except Exception as e:
         logger.error(f"Fatal error: {e}")
     
     logger.info("============ X DM SCRIPT FINISHED ============")
+    stop_logging()
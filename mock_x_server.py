@@ -0,0 +1,389 @@
+"""Local stand-in for the parts of x.com the script drives.
+
+Serves a login flow, a lazily loaded followers timeline, profiles and a DM
+composer using the same data-testid structure as the real site, so
+login_to_x, get_followers and send_dm can run offline. Profile pages switch
+in place on history changes, like X's client-side router. Follower counts come
+from the account name: /bench10000/followers lists 10000 followers.
+
+    python mock_x_server.py --port 8400 --latency 0.2
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_FOLLOWERS = 500
+SESSION_COOKIE = "auth_token=mock-session"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+  @font-face {{ font-family: "Chirp"; src: url("/fonts/chirp.woff2") format("woff2"); }}
+  body {{ font-family: "Chirp", sans-serif; margin: 0; }}
+  [data-testid="primaryColumn"] {{ width: 600px; margin: 0 auto; }}
+  [data-testid="UserCell"] {{ height: 72px; border-bottom: 1px solid #eee; }}
+  [data-testid="DMDrawer"] {{ position: fixed; right: 0; bottom: 0; width: 400px; border: 1px solid #ccc; background: #fff; }}
+  [data-testid="DmActivityViewport"] {{ height: 240px; overflow-y: auto; }}
+  [data-testid="dmComposerTextInput"] {{ min-height: 24px; border: 1px solid #999; white-space: pre-wrap; }}
+</style>
+</head>
+<body>
+{body}
+<script>
+var LATENCY_MS = {latency_ms};
+{script}
+</script>
+</body>
+</html>
+"""
+
+LOGIN_BODY = """<main id="login">
+  <input autocomplete="username" name="text" id="username">
+</main>"""
+
+LOGIN_SCRIPT = """
+var VERIFY_STEP = %(verify_step)s;
+var main = document.getElementById('login');
+function onEnter(input, next) {
+    input.addEventListener('keydown', function(e) {
+        if (e.key === 'Enter') { setTimeout(next, LATENCY_MS); }
+    });
+}
+function showPassword() {
+    main.innerHTML = '<input type="password" autocomplete="current-password" name="password" id="password">';
+    onEnter(document.getElementById('password'), function() {
+        document.cookie = '%(cookie)s; path=/';
+        location.href = '/home';
+    });
+}
+function showVerify() {
+    main.innerHTML = '<input data-testid="ocfEnterTextTextInput" name="text" id="verify">';
+    onEnter(document.getElementById('verify'), showPassword);
+}
+onEnter(document.getElementById('username'), VERIFY_STEP ? showVerify : showPassword);
+"""
+
+HOME_BODY = """<div data-testid="primaryColumn"><h2>Home</h2><section><div>Timeline</div></section></div>"""
+
+FOLLOWERS_BODY = """<div data-testid="primaryColumn">
+  <h2>@%(account)s followers</h2>
+  <section role="region"><div id="timeline"></div><div id="spacer"></div></section>
+</div>"""
+
+FOLLOWERS_SCRIPT = """
+var ACCOUNT = %(account)s;
+var PAGE_SIZE = %(page_size)d;
+var VIRTUALIZE = %(virtualize)d;
+var timeline = document.getElementById('timeline');
+var cursor = 0;
+var loading = false;
+var done = false;
+
+function cell(username) {
+    var div = document.createElement('div');
+    div.setAttribute('data-testid', 'UserCell');
+    div.innerHTML = '<a href="/' + username + '"><img alt="" src="/avatar/' + username + '.png" width="40" height="40"></a>' +
+                    '<a href="/' + username + '"><span>' + username + '</span></a>' +
+                    '<div role="button" data-testid="follow">Follow</div>';
+    return div;
+}
+
+function loadMore() {
+    if (loading || done) { return; }
+    loading = true;
+    fetch('/api/followers?account=' + ACCOUNT + '&cursor=' + cursor + '&count=' + PAGE_SIZE)
+        .then(function(r) { return r.json(); })
+        .then(function(page) {
+            setTimeout(function() {
+                page.users.forEach(function(u) { timeline.appendChild(cell(u)); });
+                cursor = page.next_cursor;
+                done = page.next_cursor === null;
+                // Like X, only keep a window of cells in the DOM
+                while (VIRTUALIZE > 0 && timeline.children.length > VIRTUALIZE) {
+                    timeline.removeChild(timeline.firstChild);
+                }
+                loading = false;
+            }, LATENCY_MS);
+        });
+}
+
+window.addEventListener('scroll', function() {
+    if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 200) { loadMore(); }
+});
+loadMore();
+"""
+
+PROFILE_BODY = """<div data-testid="primaryColumn" id="profile"></div>
+<div id="drawer"></div>"""
+
+PROFILE_SCRIPT = """
+var USERNAME = %(username_json)s;
+var DMS_OPEN = %(dms_open)s;
+
+function openComposer() {
+    setTimeout(function() {
+        document.getElementById('drawer').innerHTML =
+            '<div data-testid="DMDrawer">' +
+            '  <div data-testid="DmActivityViewport"></div>' +
+            '  <div data-testid="dmComposerTextInput" role="textbox" contenteditable="true"></div>' +
+            '  <button data-testid="dmComposerSendButton" aria-label="Send" disabled>' +
+            '    <svg style="color: rgb(29, 155, 240)" width="20" height="20"></svg>' +
+            '  </button>' +
+            '</div>';
+        var input = document.querySelector('[data-testid="dmComposerTextInput"]');
+        var send = document.querySelector('[data-testid="dmComposerSendButton"]');
+        input.addEventListener('input', function() {
+            send.disabled = input.textContent.trim() === '';
+        });
+        // Like X's rich text editor, pastes are handled by the editor instead of the browser
+        input.addEventListener('paste', function(e) {
+            e.preventDefault();
+            document.execCommand('insertText', false, e.clipboardData.getData('text/plain'));
+        });
+        input.addEventListener('keydown', function(e) {
+            if (e.key === 'Enter' && !e.shiftKey) { e.preventDefault(); sendMessage(); }
+        });
+        send.addEventListener('click', sendMessage);
+    }, LATENCY_MS);
+}
+
+function sendMessage() {
+    var input = document.querySelector('[data-testid="dmComposerTextInput"]');
+    var text = input.innerText;
+    if (text.trim() === '') { return; }
+    fetch('/api/dm', {method: 'POST', body: JSON.stringify({to: USERNAME, text: text})})
+        .then(function() {
+            var entry = document.createElement('div');
+            entry.setAttribute('data-testid', 'messageEntry');
+            entry.textContent = text;
+            document.querySelector('[data-testid="DmActivityViewport"]').appendChild(entry);
+            input.innerHTML = '';
+            document.querySelector('[data-testid="dmComposerSendButton"]').disabled = true;
+        });
+}
+
+function renderProfile() {
+    document.getElementById('profile').innerHTML =
+        '<img alt="" src="/media/' + USERNAME + '_banner.jpg" width="600" height="200">' +
+        '<img alt="" src="/avatar/' + USERNAME + '.png" width="130" height="130">' +
+        '<div data-testid="UserName"><span>' + USERNAME + '</span><span>@' + USERNAME + '</span></div>' +
+        '<div id="actions"></div>';
+
+    // Profile actions render a little after the column, like the real hydration
+    setTimeout(function() {
+        var actions = '<div data-testid="userActions"><div role="button" aria-label="More">...</div></div>';
+        if (DMS_OPEN) {
+            actions += '<button data-testid="sendDMFromProfile" aria-label="Message">Message</button>';
+        }
+        document.getElementById('actions').innerHTML = actions;
+        var button = document.querySelector('[data-testid="sendDMFromProfile"]');
+        if (button) { button.addEventListener('click', openComposer); }
+    }, LATENCY_MS);
+}
+
+// Client-side router: a history change swaps the profile without reloading the page
+window.addEventListener('popstate', function() {
+    var username = location.pathname.split('/').filter(Boolean)[0];
+    document.getElementById('profile').innerHTML = '';
+    document.getElementById('drawer').innerHTML = '';
+    fetch('/api/profile?username=' + encodeURIComponent(username))
+        .then(function(response) { return response.json(); })
+        .then(function(profile) {
+            setTimeout(function() {
+                USERNAME = profile.username;
+                DMS_OPEN = profile.dms_open;
+                renderProfile();
+            }, LATENCY_MS);
+        });
+});
+
+renderProfile();
+"""
+
+RESERVED = {'login', 'home', 'api', 'avatar', 'media', 'fonts', 'favicon.ico'}
+ASSET_TYPES = {'avatar': "image/png", 'media': "image/jpeg", 'fonts': "font/woff2"}
+
+
+class MockXState:
+    """Server-side state shared by all request handlers"""
+
+    def __init__(self, latency=0.0, page_size=50, virtualize=0, verify_step=False, closed_every=0, asset_kb=0,
+                 boot_latency=0.0):
+        self.latency = latency
+        self.boot_latency = boot_latency
+        self.page_size = page_size
+        self.virtualize = virtualize
+        self.verify_step = verify_step
+        self.closed_every = closed_every
+        self.asset = b"\0" * (asset_kb * 1024)
+        self.lock = threading.Lock()
+        self.sent = []
+        self.requests = 0
+        self.page_loads = 0
+
+    def follower_count(self, account):
+        """Follower count encoded in the account name, e.g. bench10000"""
+        match = re.search(r'(\d+)$', account)
+        return int(match.group(1)) if match else DEFAULT_FOLLOWERS
+
+    def dms_open(self, username):
+        """Every closed_every-th follower has DMs closed"""
+        match = re.search(r'(\d+)$', username)
+        if not self.closed_every or not match:
+            return True
+        return int(match.group(1)) % self.closed_every != 0
+
+
+class MockXHandler(BaseHTTPRequestHandler):
+    """Routes requests to the mock pages and JSON endpoints"""
+
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _page(self, title, body, script=""):
+        with self.state.lock:
+            self.state.page_loads += 1
+        # Stands in for downloading and booting the app bundle on every full page load
+        time.sleep(self.state.boot_latency)
+        latency_ms = int(self.state.latency * 1000)
+        self._send(200, PAGE_TEMPLATE.format(title=title, body=body, script=script, latency_ms=latency_ms))
+
+    def _logged_in(self):
+        return SESSION_COOKIE in self.headers.get("Cookie", "")
+
+    def do_GET(self):
+        with self.state.lock:
+            self.state.requests += 1
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split('/') if p]
+
+        if url.path == '/login':
+            self._page("Log in to X", LOGIN_BODY, LOGIN_SCRIPT % {
+                'verify_step': 'true' if self.state.verify_step else 'false',
+                'cookie': SESSION_COOKIE,
+            })
+        elif url.path in ('/', '/home'):
+            if self._logged_in():
+                self._page("Home / X", HOME_BODY)
+            else:
+                self._send(302, "", headers={"Location": "/login"})
+        elif url.path == '/api/followers':
+            self._followers_page(parse_qs(url.query))
+        elif url.path == '/api/profile':
+            username = parse_qs(url.query).get('username', [''])[0]
+            profile = {"username": username, "dms_open": self.state.dms_open(username)}
+            self._send(200, json.dumps(profile), "application/json")
+        elif url.path == '/api/sent':
+            with self.state.lock:
+                self._send(200, json.dumps(self.state.sent), "application/json")
+        elif parts and parts[0] in ASSET_TYPES:
+            self._send(200, self.state.asset, ASSET_TYPES[parts[0]], {"Cache-Control": "no-store"})
+        elif len(parts) == 2 and parts[1] == 'followers':
+            self._page(f"People following @{parts[0]}", FOLLOWERS_BODY % {'account': parts[0]},
+                       FOLLOWERS_SCRIPT % {
+                           'account': json.dumps(parts[0]),
+                           'page_size': self.state.page_size,
+                           'virtualize': self.state.virtualize,
+                       })
+        elif len(parts) == 1 and parts[0] not in RESERVED:
+            username = parts[0]
+            self._page(f"@{username} / X", PROFILE_BODY, PROFILE_SCRIPT % {
+                'username_json': json.dumps(username),
+                'dms_open': 'true' if self.state.dms_open(username) else 'false',
+            })
+        else:
+            self._send(404, "Not found")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        payload = self.rfile.read(length)
+        if url.path == '/api/dm':
+            message = json.loads(payload or b"{}")
+            message["at"] = time.time()
+            with self.state.lock:
+                self.state.sent.append(message)
+            self._send(200, "{}", "application/json")
+        else:
+            self._send(404, "Not found")
+
+    def _followers_page(self, query):
+        account = query.get('account', [''])[0]
+        cursor = int(query.get('cursor', ['0'])[0])
+        count = int(query.get('count', [str(self.state.page_size)])[0])
+        total = self.state.follower_count(account)
+        end = min(cursor + count, total)
+        page = {
+            "users": [f"follower{i}" for i in range(cursor, end)],
+            "next_cursor": end if end < total else None,
+        }
+        self._send(200, json.dumps(page), "application/json")
+
+
+def start_server(host="127.0.0.1", port=0, **state_options):
+    """Start the mock server in a daemon thread, returns (server, base_url)"""
+    state = MockXState(**state_options)
+    handler = type("BoundMockXHandler", (MockXHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.state = state
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Serve an offline stand-in for x.com")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8400)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before dynamic content renders")
+    parser.add_argument("--page-size", type=int, default=50, help="Followers returned per lazy load")
+    parser.add_argument("--virtualize", type=int, default=0,
+                        help="Keep at most this many follower cells in the DOM (0 keeps all)")
+    parser.add_argument("--verify-step", action="store_true", help="Ask for the username again during login")
+    parser.add_argument("--closed-every", type=int, default=0,
+                        help="Every Nth follower has DMs closed (0 means none)")
+    parser.add_argument("--asset-kb", type=int, default=0,
+                        help="Size of every avatar, banner and font response in KB")
+    parser.add_argument("--boot-latency", type=float, default=0.0,
+                        help="Extra seconds every full page load takes, like booting the real app bundle")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server, base_url = start_server(
+        args.host, args.port,
+        latency=args.latency,
+        page_size=args.page_size,
+        virtualize=args.virtualize,
+        verify_step=args.verify_step,
+        closed_every=args.closed_every,
+        asset_kb=args.asset_kb,
+        boot_latency=args.boot_latency,
+    )
+    print(f"Mock X running at {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
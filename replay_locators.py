@@ -0,0 +1,222 @@
+"""Replay saved DOM snapshots against every locator strategy, offline.
+
+    python replay_locators.py dom_snapshots --repeat 3 --json replay.json
+
+The script saves snapshots with the dom_snapshots option ('failure' or 'all'),
+and `python benchmark.py e2e --dom-snapshots` saves a corpus from the mock
+server. Each snapshot is served from a local HTTP server into headless Chrome
+with every https request blocked. Then every send_dm locator strategy and both
+follower extraction scripts run against it, and each gets a hit or miss and
+its time. Waits are capped by --wait (0 by default), because nothing more
+renders in a static page, so a miss costs the lookup plus one short poll
+instead of the strategy's live timeout.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+
+SNAPSHOT_KINDS = ('profile', 'after_type', 'dm_error', 'followers_page', 'followers_error')
+
+# Presses Enter without locating anything and always reports success, so it says nothing about the page
+SKIPPED_STRATEGIES = {('send_button', 'enter-key')}
+
+
+class SnapshotHandler(BaseHTTPRequestHandler):
+    """Serves snapshot i at /snapshot/i, anything else (links clicked by a strategy) is a 404"""
+
+    def do_GET(self):
+        paths = self.server.snapshot_paths
+        parts = self.path.split('/')
+        if len(parts) == 3 and parts[1] == 'snapshot' and parts[2].isdigit() and int(parts[2]) < len(paths):
+            with open(paths[int(parts[2])], 'rb') as f:
+                body = f.read()
+            self.send_response(200)
+        else:
+            body = b"<html><body>Not in the snapshot</body></html>"
+            self.send_response(404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(paths):
+    """Serve the snapshots on a free local port, returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SnapshotHandler)
+    server.snapshot_paths = paths
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def find_snapshots(paths):
+    """Snapshot files from files and directories given on the command line"""
+    snapshots = []
+    for path in paths:
+        if os.path.isdir(path):
+            snapshots.extend(sorted(glob.glob(os.path.join(path, '*.html'))))
+        else:
+            snapshots.append(path)
+    return snapshots
+
+
+def snapshot_kind(path):
+    """Where in the script a snapshot was taken, from its file name"""
+    name = os.path.basename(path)
+    for kind in SNAPSHOT_KINDS:
+        if name.startswith(kind + '_'):
+            return kind
+    return 'other'
+
+
+def replay_steps():
+    """(step, [(strategy name, callable(driver, options))]) in the order the script tries them"""
+    def collector(driver, options):
+        return driver.execute_script(main.FOLLOWER_COLLECTOR_JS, main.EXCLUDED_PAGES)['usernames']
+
+    def extract(driver, options):
+        return driver.execute_script(main.EXTRACT_FOLLOWERS_JS, main.EXCLUDED_PAGES)
+
+    steps = [
+        ('message_button', main.MESSAGE_BUTTON_STRATEGIES),
+        ('composer_input', main.COMPOSER_INPUT_STRATEGIES),
+        # The strategies that find the button don't use the composer element
+        ('send_button', [(name, lambda driver, options, strategy=strategy: strategy(driver, options, None))
+                         for name, strategy in main.SEND_BUTTON_STRATEGIES]),
+        ('followers', [('collector', collector), ('extract', extract)]),
+    ]
+    return [(step, [(name, strategy) for name, strategy in strategies
+                    if (step, name) not in SKIPPED_STRATEGIES])
+            for step, strategies in steps]
+
+
+def cap_waits(wait):
+    """Make the strategies' WebDriverWaits give up after wait seconds, polling every 10ms"""
+    base = main.WebDriverWait
+
+    class CappedWait(base):
+        def __init__(self, driver, timeout, poll_frequency=0.5, ignored_exceptions=None):
+            super().__init__(driver, min(timeout, wait), min(poll_frequency, 0.01), ignored_exceptions)
+
+    main.WebDriverWait = CappedWait
+
+
+def replay_snapshot(driver, url, steps, options, repeat):
+    """Time every strategy on one snapshot, reloading it whenever a strategy navigated away"""
+    results = {step: {name: {"hits": 0, "seconds": [], "found": None} for name, _ in strategies}
+               for step, strategies in steps}
+    for _ in range(repeat):
+        # A fresh page per round, the follower collector keeps its state in window
+        driver.get(url)
+        for step, strategies in steps:
+            for name, strategy in strategies:
+                started = time.perf_counter()
+                try:
+                    found = strategy(driver, options)
+                except Exception:
+                    found = None
+                elapsed = time.perf_counter() - started
+                entry = results[step][name]
+                entry["seconds"].append(elapsed)
+                if found:
+                    entry["hits"] += 1
+                    if isinstance(found, list):
+                        entry["found"] = len(found)
+                if driver.current_url != url:
+                    driver.get(url)
+    return results
+
+
+def print_summary(records, steps, repeat):
+    """Hit rate and lookup time per strategy, and per step the cost of the script's default order"""
+    print(f"{len(records)} snapshots, {repeat} round(s) each\n")
+    print(f"{'step / strategy':<32}{'hit':>8}{'p50':>10}{'p95':>10}{'max':>10}")
+    for step, strategies in steps:
+        for name, _ in strategies:
+            rows = [record["results"][step][name] for record in records]
+            times = sorted(t for row in rows for t in row["seconds"])
+            hits = sum(row["hits"] for row in rows) / (len(records) * repeat)
+            print(f"{f'{step} / {name}':<32}{hits:>8.0%}"
+                  f"{statistics.median(times) * 1000:>8.1f}ms"
+                  f"{times[int(0.95 * (len(times) - 1))] * 1000:>8.1f}ms{times[-1] * 1000:>8.1f}ms")
+
+    # Walking the default order until the first hit is what the script pays on a cold start
+    print(f"\n{'step':<16}{'any hit':>10}{'default order':>16}")
+    for step, strategies in steps:
+        located = 0
+        costs = []
+        for record in records:
+            cost = 0
+            for name, _ in strategies:
+                row = record["results"][step][name]
+                cost += statistics.median(row["seconds"])
+                if row["hits"]:
+                    located += 1
+                    break
+            costs.append(cost)
+        print(f"{step:<16}{located / len(records):>10.0%}{statistics.mean(costs) * 1000:>14.1f}ms")
+
+    by_kind = {}
+    for record in records:
+        by_kind.setdefault(record["kind"], []).append(record)
+    print()
+    for kind, kind_records in sorted(by_kind.items()):
+        winners = []
+        for step, strategies in steps:
+            winner = next((name for name, _ in strategies
+                           if all(r["results"][step][name]["hits"] for r in kind_records)), None)
+            winners.append(f"{step}={winner or '-'}")
+        print(f"{kind} ({len(kind_records)}): first strategy hitting every snapshot: {', '.join(winners)}")
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Replay DOM snapshots against the script's locator strategies")
+    parser.add_argument("paths", nargs="*", default=[main.DOM_SNAPSHOT_DIR],
+                        help="Snapshot files or directories of them")
+    parser.add_argument("--repeat", type=int, default=1, help="Rounds per snapshot")
+    parser.add_argument("--wait", type=float, default=0, help="Cap in seconds for each strategy's wait")
+    parser.add_argument("--json", help="Also write per-snapshot results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the script's INFO logging")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.verbose:
+        main.logger.setLevel("WARNING")
+    snapshots = find_snapshots(args.paths)
+    if not snapshots:
+        raise SystemExit(f"No snapshots found in {', '.join(args.paths)}")
+
+    server, base_url = start_server(snapshots)
+    # Scripts were stripped when the snapshot was taken, this keeps images, fonts and CSS from reaching X
+    driver = main.setup_driver(headless=True, block_resources=['https://*', 'wss://*'])
+    cap_waits(args.wait)
+    options = main.get_advanced_options({'options': {}})
+    steps = replay_steps()
+    records = []
+    try:
+        for index, path in enumerate(snapshots):
+            records.append({
+                "snapshot": path,
+                "kind": snapshot_kind(path),
+                "results": replay_snapshot(driver, f"{base_url}/snapshot/{index}", steps, options, args.repeat),
+            })
+    finally:
+        driver.quit()
+        server.shutdown()
+
+    print_summary(records, steps, args.repeat)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(records, f, indent=4)
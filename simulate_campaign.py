@@ -0,0 +1,196 @@
+"""Run main()'s campaign loop against a simulated browser on a virtual clock.
+
+    python simulate_campaign.py --followers 1000000 --failure-rate 0.05 --closed-rate 0.02
+
+The real main() runs: progress loading and filtering, skip_first_n and
+max_followers_to_process slicing, the retry queue, progress saving, tracing
+and logging. Chrome, login and send_dm are replaced by a seeded random
+backend, and dm_interval sleeps advance a virtual clock instead of waiting.
+Wall time is then almost all bookkeeping, reported per follower over
+successive windows so work that grows with the campaign stands out.
+Everything runs in a temporary directory. The report goes to stdout and
+the script's own log lines to stderr.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import yaml
+
+FAILURE_REASONS = ('locator_miss', 'timeout', 'verification_mismatch', 'error')
+
+
+class VirtualClock:
+    """Drop-in for main.Clock where sleeping advances the clock instantly"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def monotonic(self):
+        return self.now
+
+
+class SimulatedDriver:
+    """Stands in for the WebDriver, main() only ever quits it"""
+
+    def quit(self):
+        pass
+
+
+class SimulatedBackend:
+    """Replaces setup_driver, ensure_logged_in and send_dm with seeded random outcomes"""
+
+    def __init__(self, clock, args):
+        self.clock = clock
+        self.rng = random.Random(args.seed)
+        self.send_seconds = args.send_seconds
+        self.failure_rate = args.failure_rate
+        self.closed_rate = args.closed_rate
+        self.window = args.window
+        self.sends = 0
+        self.checkpoints = []  # (sends so far, perf_counter) at every window boundary
+
+    def install(self):
+        """Point main at the simulation"""
+        import main
+
+        main.clock = self.clock
+        main.setup_driver = self.setup_driver
+        main.ensure_logged_in = self.ensure_logged_in
+        main.send_dm = self.send_dm
+
+    def setup_driver(self, headless=True, profile_dir=None, block_resources=None):
+        return SimulatedDriver()
+
+    def ensure_logged_in(self, driver, username, password, options):
+        return True
+
+    def send_dm(self, driver, username, message, options):
+        import main
+
+        if self.sends % self.window == 0:
+            self.checkpoints.append((self.sends, time.perf_counter()))
+        self.sends += 1
+        self.clock.sleep(self.send_seconds)
+
+        roll = self.rng.random()
+        if roll < self.closed_rate:
+            return main.DMResult(False, 'dms_closed')
+        if roll < self.closed_rate + self.failure_rate:
+            return main.DMResult(False, self.rng.choice(FAILURE_REASONS))
+        return main.DMResult(True, None)
+
+
+def write_campaign(args):
+    """config.yml, a synthetic followers.txt and optionally earlier progress in the current directory"""
+    import main
+
+    config = {
+        'x_credentials': {'username': "sim", 'password': "sim", 'account_name': "sim"},
+        'message': "Hey follower! Please follow our primary account",
+        'headless': True,
+        'options': {
+            'useFollowerstxt': True,
+            'take_screenshots': False,
+            'dm_interval': args.dm_interval,
+            'retry_failed': args.retry,
+            'max_retries': args.max_retries,
+            'skip_first_n': args.skip,
+            'max_followers_to_process': args.limit or float('inf'),
+            'progress_store': args.store,
+            'progress_group_size': args.group_size,
+            'trace_steps': args.trace,
+        },
+    }
+    with open(main.CONFIG_FILE, 'w') as f:
+        yaml.safe_dump(config, f)
+
+    with open(main.FOLLOWERS_FILE, 'w') as f:
+        for i in range(args.followers):
+            f.write(f"follower{i}\n")
+
+    if args.messaged:
+        with open(main.PROGRESS_FILE, 'w') as f:
+            json.dump({"messaged_usernames": [f"follower{i}" for i in range(args.messaged)]}, f)
+
+
+def print_report(backend, clock, started, finished, rows):
+    """Bookkeeping cost per follower over the run and in evenly spaced windows"""
+    import main
+
+    wall = finished - started
+    print(f"\n{backend.sends} sends simulated in {wall:.1f}s of wall time, "
+          f"covering {main.format_duration(clock.now)} of campaign time")
+    if backend.sends:
+        print(f"Bookkeeping per follower: {wall / backend.sends * 1e6:.0f} us on average")
+
+    checkpoints = backend.checkpoints + [(backend.sends, finished)]
+    windows = [
+        (start, end, (t_end - t_start) / (end - start))
+        for (start, t_start), (end, t_end) in zip(checkpoints, checkpoints[1:]) if end > start
+    ]
+    if len(windows) < 2:
+        return
+    step = max(1, len(windows) // rows)
+    shown = windows[::step]
+    if shown[-1] is not windows[-1]:
+        shown.append(windows[-1])
+    print(f"\n{'followers':>20}{'us/follower':>14}")
+    for start, end, per_follower in shown:
+        print(f"{f'{start}-{end}':>20}{per_follower * 1e6:>14.0f}")
+    growth = windows[-1][2] / windows[0][2] if windows[0][2] else 0
+    print(f"\nLast window costs {growth:.1f}x the first per follower"
+          f"{' (bookkeeping grows with progress)' if growth > 2 else ''}")
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Simulate a campaign to measure the script's own overhead")
+    parser.add_argument("--followers", type=int, default=1000000, help="Lines in the synthetic followers.txt")
+    parser.add_argument("--messaged", type=int, default=0, help="Followers already messaged by earlier runs")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Share of sends failing for a retryable reason")
+    parser.add_argument("--closed-rate", type=float, default=0.02, help="Share of followers with DMs closed")
+    parser.add_argument("--send-seconds", type=float, default=8, help="Virtual time one send_dm takes")
+    parser.add_argument("--dm-interval", type=float, default=10, help="dm_interval option (virtual seconds)")
+    parser.add_argument("--retry", action="store_true", help="Turn retry_failed on")
+    parser.add_argument("--max-retries", type=int, default=1)
+    parser.add_argument("--skip", type=int, default=0, help="skip_first_n option")
+    parser.add_argument("--limit", type=int, default=0, help="max_followers_to_process option (0 for none)")
+    parser.add_argument("--store", choices=['json', 'sqlite'], default='json', help="progress_store option")
+    parser.add_argument("--group-size", type=int, default=1, help="progress_group_size option")
+    parser.add_argument("--no-trace", dest="trace", action="store_false", help="Turn trace_steps off")
+    parser.add_argument("--window", type=int, default=10000, help="Followers per reported window")
+    parser.add_argument("--rows", type=int, default=10, help="Windows shown in the report")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Keep the script's INFO logging")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    os.chdir(tempfile.mkdtemp(prefix="x_dm_sim_"))
+    import main
+
+    if not args.verbose:
+        main.logger.setLevel("WARNING")
+
+    write_campaign(args)
+    clock = VirtualClock()
+    backend = SimulatedBackend(clock, args)
+    backend.install()
+
+    started = time.perf_counter()
+    main.main(main.parse_args([]))
+    finished = time.perf_counter()
+
+    print_report(backend, clock, started, finished, args.rows)
+    if args.trace:
+        print()
+        main.summarize_trace(main.TRACE_FILE)
+    print(f"\nFiles are in {os.getcwd()}")